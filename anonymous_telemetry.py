@@ -16,12 +16,15 @@ Features:
 
 import hashlib
 import json
+import mmap
 import os
 import subprocess
+import threading
 import time
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional, Any, Tuple
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 # Optional dependencies with graceful fallback
 try:
@@ -31,6 +34,56 @@ except ImportError:
     HAS_PYPDF2 = False
 
 
+# Readers shared by fingerprinting and metadata extraction inside one _shared_pdf_reader() block:
+# path -> ((mtime_ns, size), reader, mapping); None until the first read
+_shared_readers: Dict[str, Optional[Tuple[Tuple[int, int], "PyPDF2.PdfReader", mmap.mmap]]] = {}
+_shared_readers_lock = threading.Lock()
+
+
+@contextmanager
+def _shared_pdf_reader(pdf_path: Path) -> Iterator[None]:
+    """Parse pdf_path at most once inside this block; its mapping is closed on exit so the
+    file can be moved (Windows refuses to move a mapped file)."""
+    key = str(pdf_path)
+    with _shared_readers_lock:
+        _shared_readers.setdefault(key, None)
+    try:
+        yield
+    finally:
+        with _shared_readers_lock:
+            entry = _shared_readers.pop(key, None)
+        if entry is not None:
+            entry[2].close()
+
+
+def _pdf_reader(pdf_path: Path) -> "PyPDF2.PdfReader":
+    """PyPDF2 reader for pdf_path: the shared one inside _shared_pdf_reader(),
+    else a private copy."""
+    key = str(pdf_path)
+    with _shared_readers_lock:
+        shared = key in _shared_readers
+        entry = _shared_readers.get(key)
+    if not shared:
+        # PyPDF2 reads a path into memory and closes it: nothing stays open
+        return PyPDF2.PdfReader(key)
+    st = pdf_path.stat()
+    stamp = (st.st_mtime_ns, st.st_size)
+    if entry is not None and entry[0] == stamp:
+        return entry[1]
+    # Map the file so the reader outlives the handle without copying it onto the heap;
+    # mtime/size catch rewrites
+    with open(pdf_path, 'rb') as f:
+        mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    reader = PyPDF2.PdfReader(mapping)
+    with _shared_readers_lock:
+        # If the block ended meanwhile, the mapping is closed with the reader instead
+        if key in _shared_readers:
+            _shared_readers[key] = (stamp, reader, mapping)
+    if entry is not None:
+        entry[2].close()
+    return reader
+
+
 class DocumentFingerprint:
     """Generate anonymous document identifiers based on technical characteristics."""
     
@@ -76,9 +129,7 @@ class DocumentFingerprint:
             # Add page count if PyPDF2 is available
             if HAS_PYPDF2:
                 try:
-                    with open(pdf_path, 'rb') as f:
-                        reader = PyPDF2.PdfReader(f)
-                        fingerprint_data['page_count'] = len(reader.pages)
+                    fingerprint_data['page_count'] = len(_pdf_reader(pdf_path).pages)
                 except Exception:
                     fingerprint_data['page_count'] = 0
             
@@ -136,21 +187,20 @@ class TechnicalMetadataExtractor:
             # Enhanced analysis with PyPDF2 if available
             if HAS_PYPDF2:
                 try:
-                    with open(pdf_path, 'rb') as f:
-                        reader = PyPDF2.PdfReader(f)
-                        metadata['page_count'] = len(reader.pages)
+                    reader = _pdf_reader(pdf_path)
+                    metadata['page_count'] = len(reader.pages)
+                    
+                    # Analyze first few pages for content type (no actual content extraction)
+                    for i, page in enumerate(reader.pages[:3]):  # Max 3 pages for sampling
+                        try:
+                            # Check for resources without extracting content
+                            if '/XObject' in page.get('/Resources', {}):
+                                metadata['has_images'] = True
+                            if '/Font' in page.get('/Resources', {}):
+                                metadata['has_text'] = True
+                        except Exception:
+                            continue
                         
-                        # Analyze first few pages for content type (no actual content extraction)
-                        for i, page in enumerate(reader.pages[:3]):  # Max 3 pages for sampling
-                            try:
-                                # Check for resources without extracting content
-                                if '/XObject' in page.get('/Resources', {}):
-                                    metadata['has_images'] = True
-                                if '/Font' in page.get('/Resources', {}):
-                                    metadata['has_text'] = True
-                            except Exception:
-                                continue
-                            
                 except Exception as e:
                     # PyPDF2 failed, use Ghostscript fallback
                     metadata.update(TechnicalMetadataExtractor._ghostscript_analysis(pdf_path))
@@ -182,7 +232,9 @@ class TechnicalMetadataExtractor:
             # Try to get page count using Ghostscript
             cmd = ['gs', '-q', '-dNODISPLAY', '-c', 
                    f'({pdf_path}) (r) file runpdfbegin pdfpagecount = quit']
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=10)
+            result = subprocess.run(
+                cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, timeout=10
+            )
             
             if result.returncode == 0 and result.stdout.strip().isdigit():
                 analysis['page_count'] = int(result.stdout.strip())
@@ -224,11 +276,12 @@ class AnonymousTelemetry:
         Returns:
             Anonymous document ID
         """
-        # Generate anonymous ID
-        doc_id = self.fingerprint_generator.generate_anonymous_id(pdf_path)
-        
-        # Extract technical metadata
-        metadata = self.metadata_extractor.extract_metadata(pdf_path)
+        with _shared_pdf_reader(pdf_path):
+            # Generate anonymous ID
+            doc_id = self.fingerprint_generator.generate_anonymous_id(pdf_path)
+
+            # Extract technical metadata
+            metadata = self.metadata_extractor.extract_metadata(pdf_path)
         
         # Store document analysis (anonymized)
         doc_data = {
@@ -0,0 +1,39 @@
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from compressor import PDFCompressor  # noqa: E402
+
+PLAN = [(name, None) for name in ("conservative", "high_quality", "balanced", "aggressive_safe")]
+
+
+def pruned(**pdf_class) -> list:
+    pdf_class = {
+        "kind": "mixed",
+        "pre_optimized": False,
+        "already_optimized": False,
+        "fully_optimized": False,
+        **pdf_class,
+    }
+    return [name for name, _ in compressor._prune_plan(PLAN, pdf_class)]
+
+
+with tempfile.TemporaryDirectory() as tmp:
+    compressor = PDFCompressor(
+        input_dir=str(Path(tmp) / "input"), output_dir=str(Path(tmp) / "output"),
+        enable_telemetry=False,
+    )
+    try:
+        assert pruned(kind="text_only") == ["conservative"]
+        # The text_only pass is the one already_optimized drops: a safer one must remain
+        kept = pruned(kind="text_only", already_optimized=True)
+        assert kept and set(kept) <= set(PDFCompressor.SAFER_ALTERNATIVES), kept
+        assert "conservative" not in pruned(kind="image_heavy")
+        assert pruned(fully_optimized=True) == []
+    finally:
+        compressor.close()
+
+print("Prune test passed")
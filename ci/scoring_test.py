@@ -0,0 +1,33 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from compressor import PDFCompressor  # noqa: E402
+
+# Size score by reduction %: peaks at 50%, 80 at 80%, 0 for a 100% reduction
+EXPECTED = {
+    0.0: 70.0,
+    2.5: 75.0,
+    5.0: 80.0,
+    27.5: 90.0,
+    50.0: 100.0,
+    65.0: 90.0,
+    80.0: 80.0,
+    90.0: 40.0,
+    100.0: 0.0,
+}
+
+reductions = np.array(list(EXPECTED))
+scores = np.interp(reductions, PDFCompressor.REDUCTION_SCORE_XP, PDFCompressor.REDUCTION_SCORE_FP)
+for reduction, expected, score in zip(reductions, EXPECTED.values(), scores):
+    assert abs(score - expected) < 1e-9, (
+        f"{reduction}% reduction scored {score}, expected {expected}"
+    )
+
+assert PDFCompressor.METHOD_BONUS == {"conservative": 10.0, "high_quality": 8.0, "balanced": 5.0}
+
+print("Scoring test passed")
@@ -1,9 +1,14 @@
 import os
+import subprocess
 import sys
+import tempfile
 from pathlib import Path
-from reportlab.pdfgen import canvas
+
+import numpy as np
+from PIL import Image
 from reportlab.lib.pagesizes import letter
-import subprocess
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfgen import canvas
 
 ROOT = Path(__file__).resolve().parents[1]
 INPUT = ROOT / 'input'
@@ -21,20 +26,58 @@ if not sample_pdf.exists():
     c.showPage()
     c.save()
 
+
+def make_image_pdf(path: Path) -> None:
+    """Image-heavy sample: two pages, each one full-page noisy photo-like image."""
+    rng = np.random.default_rng(0)
+    y, x = np.mgrid[0:600, 0:450]
+    c = canvas.Canvas(str(path), pagesize=letter)
+    for _ in range(2):
+        img = np.stack([x * 255 / 450, y * 255 / 600, (x + y) % 255], axis=-1)
+        img = np.clip(img + rng.normal(0, 8, img.shape), 0, 255).astype(np.uint8)
+        c.drawImage(ImageReader(Image.fromarray(img)), 36, 72, width=540, height=648)
+        c.showPage()
+    c.save()
+
+
+# Image-heavy files take the gs stages first (the qpdf pass is pruned for them)
+image_pdf = INPUT / 'ci_images.pdf'
+if not image_pdf.exists():
+    make_image_pdf(image_pdf)
+
 # Use the new v1 English CLI only
 script = ROOT / 'compressor.py'
 if not script.exists():
     raise FileNotFoundError("compressor.py not found. Ensure you're running from the repo root.")
 
+
+def run(*args: str) -> str:
+    print(f"Running: {script} {' '.join(args)}")
+    res = subprocess.run([sys.executable, str(script), *args], capture_output=True, text=True)
+    print(res.stdout)
+    print(res.stderr)
+    return res.stdout + res.stderr
+
+
 # Run the compressor
-print(f"Running: {script}")
-res = subprocess.run([sys.executable, str(script)], capture_output=True, text=True)
-print(res.stdout)
-print(res.stderr)
+log = run()
+assert "❌ Error" not in log, "A file failed to compress"
 
 # Assert output exists
 outs = list(OUTPUT.glob('*optimized*.pdf')) + list(OUTPUT.glob('*.pdf'))
 assert len(outs) > 0, "No output PDFs produced"
+assert (OUTPUT / 'ci_images_optimized.pdf').exists(), "No output for the image-heavy PDF"
+
+# --force-all runs every strategy, bypassing pruning and early stops
+with tempfile.TemporaryDirectory() as tmp:
+    force_in, force_out = Path(tmp) / 'input', Path(tmp) / 'output'
+    force_in.mkdir()
+    make_image_pdf(force_in / 'ci_images.pdf')
+    force_log = run(
+        '--input', str(force_in), '--output', str(force_out), '--force-all', '--no-cache'
+    )
+    assert "❌ Error" not in force_log, "A file failed to compress with --force-all"
+    assert (force_out / 'ci_images_optimized.pdf').exists(), "No output with --force-all"
 
 print("Smoke test passed with outputs:")
 for p in outs:
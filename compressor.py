@@ -15,12 +15,31 @@ Quality Gates:
   - LPIPS (learned perceptual image patch similarity) - optional, threshold 0.15
 """
 
+import atexit
+import functools
+import hashlib
+import io
+import json
+import logging
+import logging.handlers
+import math
+import os
+import queue
+import re
+import select
 import shutil
 import subprocess
+import sys
 import tempfile
-import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from itertools import chain
 from pathlib import Path
-from typing import List, Dict, Tuple, Optional, Any
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
 
 # Try to import advanced quality gates
 try:
@@ -29,6 +48,49 @@ try:
 except ImportError:
     HAS_ADVANCED_GATES = False
 
+# Try to import pikepdf (optional): runs the qpdf pass in-process via QPDFJob
+try:
+    import pikepdf
+    HAS_PIKEPDF = hasattr(pikepdf, "Job")
+except ImportError:
+    HAS_PIKEPDF = False
+
+# Try to import pypdfium2 (optional): renders quality-gate rasters in-process instead of via gs
+try:
+    import pypdfium2 as pdfium
+    HAS_PDFIUM = True
+except ImportError:
+    HAS_PDFIUM = False
+_PDFIUM_LOCK = threading.Lock()
+
+# Try to import img2pdf (optional): wraps G4 TIFFs, JPEGs and PNGs into a PDF without re-encoding
+try:
+    import img2pdf
+    HAS_IMG2PDF = True
+except ImportError:
+    HAS_IMG2PDF = False
+
+# Try to import numba (optional): one-pass page statistics when OpenCV is missing
+try:
+    from numba import njit, prange
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+# Try to import OpenCV (optional): uint8 SIMD page filters, metrics and PNG decoding
+try:
+    import cv2
+    HAS_CV2 = True
+except ImportError:
+    HAS_CV2 = False
+
+# Try to import Pillow (optional): PNG decoding when OpenCV is missing
+try:
+    from PIL import Image
+    HAS_PIL = True
+except ImportError:
+    HAS_PIL = False
+
 # Try to import anonymous telemetry (optional)
 try:
     from anonymous_telemetry import AnonymousTelemetry
@@ -36,33 +98,702 @@ try:
 except ImportError:
     HAS_TELEMETRY = False
 
+logger = logging.getLogger("pdf_ultra_compressor")
+
+# Byte-level markers for the cheap pre-classification in PDFCompressor._classify_pdf.
+# Stream objects (images) can never live inside object streams, so their dictionaries
+# are always visible in the raw file.
+_SCAN_PATTERNS = {
+    "images": re.compile(rb"/Subtype\s*/Image"),
+    "pages": re.compile(rb"/Type\s*/Page(?![A-Za-z])"),
+    "streams": re.compile(rb"/Length(?![0-9A-Za-z])"),
+    "filters": re.compile(rb"/Filter(?![A-Za-z])"),
+    "object_streams": re.compile(rb"/Type\s*/ObjStm"),
+}
+# Files already below this many bytes per page gain little from the aggressive pass
+PRE_OPTIMIZED_BYTES_PER_PAGE = 200 * 1024
+# Already-optimized files (see _classify_pdf) below this many bytes per page are kept as they are
+FULLY_OPTIMIZED_BYTES_PER_PAGE = 80 * 1024
+
+# Tool detection results are cached per $PATH for a day
+TOOLS_CACHE_FILE = (
+    Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache")
+    / "pdf-ultra-compressor"
+    / "tools.json"
+)
+TOOLS_CACHE_TTL_S = 24 * 3600
+# Prior results keyed by input content + options, so identical inputs are never recompressed
+RESULTS_CACHE_FILE = TOOLS_CACHE_FILE.with_name("results.json")
+# Memory-backed scratch (Linux); used when it has RAMDISK_HEADROOM x the input size free
+RAMDISK_DIR = Path("/dev/shm")
+RAMDISK_HEADROOM = 8
+RAMDISK_MIN_FREE = 256 * 1024 * 1024
+# 20*log10(MAX) for 8-bit rasters: PSNR = _PSNR_PEAK_DB - 10*log10(MSE)
+_PSNR_PEAK_DB = 20 * math.log10(255.0)
+
+
+def _setup_logging() -> logging.Logger:
+    """Route compressor output through a queue drained by a single stdout writer.
+
+    Worker threads only enqueue records, so they never contend for the stdout lock.
+    """
+    if logger.handlers:
+        return logger
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(logging.Formatter("%(message)s"))
+    listener = logging.handlers.QueueListener(log_queue, stream)
+    listener.start()
+    atexit.register(listener.stop)
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    return logger
+
+
+def _read_once(path: Path) -> bytes:
+    """Read a throwaway file (e.g. a gate raster) without leaving it in the page cache."""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        if hasattr(os, "posix_fadvise"):
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        chunks = []
+        while True:
+            chunk = os.read(fd, 1 << 20)
+            if not chunk:
+                break
+            chunks.append(chunk)
+        if hasattr(os, "posix_fadvise"):
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        return b"".join(chunks)
+    finally:
+        os.close(fd)
+
+
+# Ink blobs smaller than this (px at 300 dpi, after the 3x3 pre-threshold blur grows a lone dark
+# pixel to ~9) are scanner speckle; a period is 40+ px
+_SPECK_MAX_AREA = 12
+
+
+def _denoise_page(img: Any, mode: Optional[str]) -> Optional[bytes]:
+    """Denoise one BGR page for the anti-noise raster strategy and encode it (None on failure).
+
+    Gray pages come back as PNG, color pages as JPEG; img2pdf embeds either without
+    re-encoding, straight from memory.
+    """
+    try:
+        if mode == 'bitonal':
+            # Filters write into buffers this page already owns (dst=) instead of allocating
+            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+            blur = cv2.GaussianBlur(gray, (3, 3), 0, dst=gray)
+            th = cv2.adaptiveThreshold(blur, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+                                       cv2.THRESH_BINARY, 19, 9)
+            # Drop isolated ink specks (black components under _SPECK_MAX_AREA px) with one
+            # label lookup; unlike an opening this leaves thin strokes and dots untouched
+            _, labels, stats, _ = cv2.connectedComponentsWithStats(
+                cv2.bitwise_not(th), connectivity=8
+            )
+            speck = stats[:, cv2.CC_STAT_AREA] < _SPECK_MAX_AREA
+            speck[0] = False  # background
+            th[speck[labels]] = 255
+            out = th
+            save_gray = True
+        elif mode == 'grayscale':
+            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+            dn = cv2.fastNlMeansDenoising(
+                gray, None, h=8, templateWindowSize=7, searchWindowSize=21
+            )
+            # Unsharp mask
+            g = cv2.GaussianBlur(dn, (0, 0), 0.8, dst=gray)
+            out = cv2.addWeighted(dn, 1.5, g, -0.5, 0, dst=dn)
+            save_gray = True
+        else:
+            # color: chroma denoise + luma sharpen
+            ycrcb = cv2.cvtColor(img, cv2.COLOR_BGR2YCrCb)
+            y, cr, cb = cv2.split(ycrcb)
+            # Chroma is denoised at half resolution (a quarter of the NL-means work); the JPEG
+            # output subsamples it 2x anyway, so nothing visible is lost
+            h, w = y.shape
+            half = (max(1, w // 2), max(1, h // 2))
+            cr, cb = (
+                cv2.resize(
+                    cv2.fastNlMeansDenoising(
+                        cv2.resize(c, half, interpolation=cv2.INTER_AREA), None, h=5
+                    ),
+                    (w, h),
+                    interpolation=cv2.INTER_LINEAR,
+                )
+                for c in (cr, cb)
+            )
+            # Sharpen luma (uint8 saturating arithmetic: no clip/cast needed)
+            g = cv2.GaussianBlur(y, (0, 0), 0.8)
+            y = cv2.addWeighted(y, 1.4, g, -0.4, 0, dst=y)
+            # Planes go back into the YCrCb buffer and the result into the page buffer
+            for i, plane in enumerate((y, cr, cb)):
+                cv2.insertChannel(plane, ycrcb, i)
+            out = cv2.cvtColor(ycrcb, cv2.COLOR_YCrCb2BGR, dst=img)
+            save_gray = False
+
+        if save_gray:
+            ok, buf = cv2.imencode(".png", out)
+        else:
+            ok, buf = cv2.imencode(".jpg", out, [cv2.IMWRITE_JPEG_QUALITY, 85])
+        return buf.tobytes() if ok else None
+    except Exception:
+        return None
+
+
+if HAS_NUMBA:
+    @njit(parallel=True, cache=True)
+    def _rgb_page_stats(rgb):
+        """(colorfulness, dark pixels, light pixels, total pixels) of an (h, w, 3) uint8 page,
+        in one pass."""
+        h, w = rgb.shape[0], rgb.shape[1]
+        deviation = 0.0
+        low = 0
+        high = 0
+        for y in prange(h):
+            for x in range(w):
+                r = np.int32(rgb[y, x, 0])
+                g = np.int32(rgb[y, x, 1])
+                b = np.int32(rgb[y, x, 2])
+                deviation += abs(r - g) + abs(g - b) + abs(b - r)
+                gray = 0.299 * r + 0.587 * g + 0.114 * b
+                if gray < 30:
+                    low += 1
+                elif gray > 225:
+                    high += 1
+        return deviation / (h * w * 3 * 255.0), low, high, h * w
+
+
+# On macOS CPython launches children with fork+exec, copying the page tables of a process that may
+# hold page rasters; close_fds=False (safe: our fds are non-inheritable, PEP 446) lets it use the
+# posix_spawn syscall instead. Linux already launches through vfork, which measured faster.
+_SPAWN_KW: Dict[str, Any] = {"close_fds": False} if sys.platform == "darwin" else {}
+
+
+def _run_silent(
+    cmd: List[str], timeout: float, keep_stderr: bool = False
+) -> subprocess.CompletedProcess:
+    """Run a tool whose output is never read.
+
+    With keep_stderr, stderr is kept (as bytes) for error reports.
+    """
+    stderr = subprocess.PIPE if keep_stderr else subprocess.DEVNULL
+    return subprocess.run(
+        cmd, stdout=subprocess.DEVNULL, stderr=stderr, timeout=timeout, **_SPAWN_KW
+    )
+
+
+def _ps_string(path: Path) -> str:
+    """Escape a filesystem path for use inside a PostScript string literal."""
+    return str(path).replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _gs_permit_args(read: Sequence[str] = (), write: Sequence[str] = ()) -> List[str]:
+    """-dSAFER allow-list switches for the paths a gs process has to open.
+
+    gs compares these as strings, so jobs must use the same absolute paths; a trailing
+    * grants everything under a prefix.
+    """
+    return [f"--permit-file-read={os.path.abspath(p)}" for p in read] + [
+        f"--permit-file-write={os.path.abspath(p)}" for p in write
+    ]
+
+
+# ---------- Ghostscript pdfwrite argument templates ----------
+# Built once at import; each strategy only appends -sOutputFile and the input path.
+
+_HQ_GS_ARGS: Tuple[str, ...] = (
+    "-sDEVICE=pdfwrite",
+    "-dCompatibilityLevel=1.7",
+    "-dPDFSETTINGS=/prepress",
+    "-dNOPAUSE",
+    "-dQUIET",
+    "-dBATCH",
+    "-dColorImageResolution=300",
+    "-dGrayImageResolution=300",
+    "-dMonoImageResolution=1200",
+    "-dColorImageDownsampleThreshold=2.0",
+    "-dGrayImageDownsampleThreshold=2.0",
+    "-dMonoImageDownsampleThreshold=2.0",
+    "-dOptimize=true",
+    "-dEmbedAllFonts=true",
+    "-dSubsetFonts=true",
+    "-dCompressFonts=false",
+    "-dPreserveAnnots=true",
+)
+
+_BALANCED_GS_ARGS: Tuple[str, ...] = (
+    "-sDEVICE=pdfwrite",
+    "-dCompatibilityLevel=1.6",
+    "-dPDFSETTINGS=/printer",
+    "-dNOPAUSE",
+    "-dQUIET",
+    "-dBATCH",
+    "-dColorImageResolution=200",
+    "-dGrayImageResolution=200",
+    "-dMonoImageResolution=600",
+    "-dColorImageDownsampleThreshold=1.5",
+    "-dOptimize=true",
+    "-dEmbedAllFonts=true",
+    "-dSubsetFonts=true",
+)
+
+_AGGRESSIVE_GS_ARGS: Tuple[str, ...] = (
+    "-sDEVICE=pdfwrite",
+    "-dCompatibilityLevel=1.5",
+    "-dPDFSETTINGS=/ebook",
+    "-dNOPAUSE",
+    "-dQUIET",
+    "-dBATCH",
+    "-dColorImageResolution=150",
+    "-dGrayImageResolution=150",
+    "-dMonoImageResolution=600",
+    "-dColorImageDownsampleThreshold=1.2",
+    "-dOptimize=true",
+    "-dEmbedAllFonts=true",
+    "-dSubsetFonts=true",
+    "-dDetectDuplicateImages=true",
+)
+
+_TEXT_PRESERVE_GS_ARGS: Tuple[str, ...] = (
+    "-sDEVICE=pdfwrite",
+    "-dCompatibilityLevel=1.6",
+    "-dNOPAUSE",
+    "-dQUIET",
+    "-dBATCH",
+    # Avoid auto filters that may pick noisy JPEG for gray
+    "-dAutoFilterGrayImages=false",
+    "-dGrayImageFilter=/FlateEncode",
+    # Prefer CCITT for mono (bitonal) content
+    "-dAutoFilterMonoImages=false",
+    "-dMonoImageFilter=/CCITTFaxEncode",
+    "-dMonoImageDownsampleType=/Subsample",
+    "-dMonoImageResolution=600",
+    # Color images with moderate JPEG quality
+    "-dAutoFilterColorImages=false",
+    "-dColorImageFilter=/DCTEncode",
+    "-dJPEGQ=85",
+    "-dColorImageDownsampleType=/Bicubic",
+    "-dColorImageResolution=200",
+    # Gray images kept higher res, helps text scans
+    "-dGrayImageDownsampleType=/Bicubic",
+    "-dGrayImageResolution=300",
+    # Preserve annotations and fonts
+    "-dEmbedAllFonts=true",
+    "-dSubsetFonts=true",
+    "-dCompressFonts=false",
+    "-dPreserveAnnots=true",
+    "-dDetectDuplicateImages=true",
+)
+
+_GRAYSCALE_PREF_GS_ARGS: Tuple[str, ...] = (
+    "-sDEVICE=pdfwrite",
+    "-dCompatibilityLevel=1.6",
+    "-dNOPAUSE",
+    "-dQUIET",
+    "-dBATCH",
+    # Suggest grayscale conversion for output
+    "-sColorConversionStrategy=Gray",
+    "-dProcessColorModel=/DeviceGray",
+    # Filters
+    "-dAutoFilterGrayImages=false",
+    "-dGrayImageFilter=/DCTEncode",
+    "-dJPEGQ=90",
+    "-dGrayImageDownsampleType=/Bicubic",
+    "-dGrayImageResolution=300",
+    # Keep mono CCITT
+    "-dAutoFilterMonoImages=false",
+    "-dMonoImageFilter=/CCITTFaxEncode",
+    "-dMonoImageResolution=600",
+    # Preserve fonts/annots
+    "-dEmbedAllFonts=true",
+    "-dSubsetFonts=true",
+    "-dCompressFonts=false",
+    "-dPreserveAnnots=true",
+)
+
+_COLOR_TEXT_SAFE_GS_ARGS: Tuple[str, ...] = (
+    "-sDEVICE=pdfwrite",
+    "-dCompatibilityLevel=1.6",
+    "-dNOPAUSE",
+    "-dQUIET",
+    "-dBATCH",
+    # Color images: no downsample, high quality JPEG
+    "-dDownsampleColorImages=false",
+    "-dAutoFilterColorImages=false",
+    "-dColorImageFilter=/DCTEncode",
+    "-dJPEGQ=95",
+    # Gray images: lossless to keep text edges
+    "-dAutoFilterGrayImages=false",
+    "-dGrayImageFilter=/FlateEncode",
+    "-dGrayImageDownsampleType=/Bicubic",
+    "-dGrayImageResolution=300",
+    # Mono: CCITT
+    "-dAutoFilterMonoImages=false",
+    "-dMonoImageFilter=/CCITTFaxEncode",
+    "-dMonoImageResolution=600",
+    # Preserve fonts/annots
+    "-dEmbedAllFonts=true",
+    "-dSubsetFonts=true",
+    "-dCompressFonts=false",
+    "-dPreserveAnnots=true",
+    "-dDetectDuplicateImages=true",
+)
+
+
+# Command-line switches that configure the gs process rather than the pdfwrite output
+_GS_PROCESS_SWITCHES = {"NOPAUSE", "QUIET", "BATCH", "SAFER", "NEWPDF", "DEVICE"}
+# pdfwrite settings that are device parameters (setpagedevice) rather than distiller parameters
+_GS_DEVICE_PARAMS = {"ProcessColorModel"}
+
+
+def _pdfwrite_ps_settings(
+    args: Sequence[str],
+) -> Tuple[Optional[str], Dict[str, str], Dict[str, str]]:
+    """Translate pdfwrite -d/-s switches into PostScript.
+
+    Returns (PDFSETTINGS preset, distiller params, device params).
+    """
+    preset: Optional[str] = None
+    distiller: Dict[str, str] = {}
+    device: Dict[str, str] = {}
+    for arg in args:
+        if not arg.startswith(("-d", "-s")) or "=" not in arg:
+            continue
+        key, raw = arg[2:].split("=", 1)
+        if key in _GS_PROCESS_SWITCHES:
+            continue
+        if key == "PDFSETTINGS":
+            preset = raw
+            continue
+        if arg.startswith("-s") or raw.startswith("/"):
+            value = raw if raw.startswith("/") else f"/{raw}"
+        elif raw in ("true", "false"):
+            value = raw
+        else:
+            try:
+                float(raw)
+                value = raw
+            except ValueError:
+                value = f"({_ps_string(Path(raw))})"
+        (device if key in _GS_DEVICE_PARAMS else distiller)[key] = value
+    return preset, distiller, device
+
+
+def _ps_dict(params: Dict[str, str]) -> str:
+    return "<< " + " ".join(f"/{k} {v}" for k, v in params.items()) + " >>"
+
+
+class _PdfwriteSession:
+    """Rendezvous that lets one file's concurrent pdfwrite strategies share a single gs process.
+
+    Each strategy thread submits its pass; the last to arrive renders all of them and the
+    others wait. If a peer never arrives, or the shared run fails a pass, submit() returns
+    None and the caller falls back to its own one-shot run.
+    """
+
+    def __init__(
+        self,
+        expected: int,
+        render: Callable[[List[Tuple[str, Sequence[str], Path]]], Set[str]],
+        wait_s: float = 30.0,
+    ):
+        self._expected = expected
+        self._render = render
+        self._wait_s = wait_s
+        self._cond = threading.Condition()
+        self._jobs: List[Tuple[str, Sequence[str], Path]] = []
+        self._done: Optional[Set[str]] = None
+        self._abandoned = False
+
+    def submit(self, variant: str, args: Sequence[str], out: Path) -> Optional[bool]:
+        with self._cond:
+            if self._abandoned:
+                return None
+            self._jobs.append((variant, args, out))
+            if len(self._jobs) < self._expected:
+                arrived = self._cond.wait_for(
+                    lambda: len(self._jobs) >= self._expected or self._abandoned,
+                    timeout=self._wait_s,
+                )
+                if not arrived or self._abandoned:
+                    self._abandoned = True
+                    self._cond.notify_all()
+                    return None
+                self._cond.wait_for(lambda: self._done is not None)
+                return variant in self._done or None  # type: ignore[operator]
+            jobs = list(self._jobs)
+        try:
+            done = self._render(jobs)
+        except Exception:
+            done = set()
+        with self._cond:
+            self._done = done
+            self._cond.notify_all()
+        return variant in done or None
+
+
+class _RasterCache:
+    """Per-file page rasters shared by the selection pool threads and the quality gates.
+
+    Keys start with the rendered file's path. Every access holds the lock, and the byte
+    total is kept as a running counter instead of being re-summed on each insert.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.lock = threading.Lock()
+        self.max_bytes = max_bytes
+        self.used = 0
+        self._entries: Dict[Tuple[Any, ...], Tuple[int, List[Any]]] = {}
+
+    def get(self, key: Tuple[Any, ...]) -> Optional[Tuple[int, List[Any]]]:
+        with self.lock:
+            return self._entries.get(key)
+
+    def put(self, key: Tuple[Any, ...], pages: int, rasters: List[Any]) -> None:
+        size = sum(a.nbytes for a in rasters)
+        with self.lock:
+            old = self._entries.get(key)
+            used = self.used - (sum(a.nbytes for a in old[1]) if old else 0)
+            if used + size <= self.max_bytes:
+                self._entries[key] = (pages, rasters)
+                self.used = used + size
+
+    def discard(self, path: str) -> None:
+        with self.lock:
+            for key in [k for k in self._entries if k[0] == path]:
+                _, rasters = self._entries.pop(key)
+                self.used -= sum(a.nbytes for a in rasters)
+
+
+class _GsWorker:
+    """Long-lived Ghostscript pdfwrite interpreter fed jobs over stdin.
+
+    Startup (font cache, CMaps, init files) is paid once instead of once per file.
+    Distiller parameters are fixed when the device opens, so each worker serves a
+    single strategy variant. Every job points /OutputFile at the candidate, runs the
+    input, then switches back to a scratch file so pdfwrite finalizes the candidate
+    before the completion sentinel is printed.
+    """
+
+    _DONE = b"%%PDFUC-DONE"
+    _FAIL = b"%%PDFUC-FAIL"
+
+    def __init__(
+        self,
+        gs: str,
+        args: Sequence[str],
+        tmpdir: Optional[str] = None,
+        read: Sequence[str] = (),
+        write: Sequence[str] = (),
+    ):
+        self.lock = threading.Lock()
+        fd, scratch = tempfile.mkstemp(suffix="_gsworker.pdf", dir=tmpdir)
+        os.close(fd)
+        self._scratch = Path(os.path.abspath(scratch))
+        self._buf = b""
+        # SAFER: a hostile input must not reach the filesystem. The worker serves every
+        # file of the batch, so the caller permits the dirs its inputs and candidates live in
+        permits = _gs_permit_args(read, [*write, str(self._scratch)])
+        self._proc: Optional[subprocess.Popen] = subprocess.Popen(
+            [gs, "-dSAFER", *permits, *args, f"-sOutputFile={self._scratch}", "-"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            bufsize=0,
+            **_SPAWN_KW,
+        )
+
+    @property
+    def alive(self) -> bool:
+        return self._proc is not None and self._proc.poll() is None
+
+    def run(self, pdf: Path, out: Path, timeout: float) -> bool:
+        if not self.alive:
+            return False
+        job = (
+            f"<< /OutputFile ({_ps_string(os.path.abspath(out))}) >> setpagedevice\n"
+            f"{{ ({_ps_string(os.path.abspath(pdf))}) run }} stopped "
+            f"{{ ({self._FAIL.decode()}\\n) }} {{ ({self._DONE.decode()}\\n) }} ifelse\n"
+            f"<< /OutputFile ({_ps_string(self._scratch)}) >> setpagedevice\n"
+            "print flush\n"
+        )
+        try:
+            self._proc.stdin.write(job.encode())  # type: ignore[union-attr]
+            self._proc.stdin.flush()  # type: ignore[union-attr]
+            marker = self._wait_for_marker(timeout)
+        except OSError:
+            marker = None
+        if marker is None:
+            # Hung or died mid-job: its state is unknown, so retire it
+            self.close()
+            return False
+        return marker == self._DONE
+
+    def _wait_for_marker(self, timeout: float) -> Optional[bytes]:
+        fd = self._proc.stdout.fileno()  # type: ignore[union-attr]
+        deadline = time.monotonic() + timeout
+        while True:
+            for marker in (self._DONE, self._FAIL):
+                idx = self._buf.find(marker)
+                if idx >= 0:
+                    self._buf = self._buf[idx + len(marker):]
+                    return marker
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            ready, _, _ = select.select([fd], [], [], remaining)
+            if not ready:
+                return None
+            chunk = os.read(fd, 4096)
+            if not chunk:
+                return None
+            # Keep only a tail large enough to hold a split marker
+            self._buf = (self._buf + chunk)[-4096:]
+
+    def close(self) -> None:
+        proc, self._proc = self._proc, None
+        if proc is not None:
+            try:
+                proc.stdin.close()  # type: ignore[union-attr]
+                proc.wait(timeout=10)
+            except Exception:
+                proc.kill()
+        self._scratch.unlink(missing_ok=True)
+
 
 class PDFCompressor:
     """Quality-first PDF compressor with tool auto-detection and safety guards."""
 
-    def __init__(self, input_dir: str = "input", output_dir: str = "output", enable_advanced_gates: bool = False,
-                 enable_telemetry: bool = True, enable_anti_noise: bool = False):
+    # Candidates the quality gates fall back to; kept on disk until the gates have run.
+    SAFER_ALTERNATIVES: Tuple[str, ...] = ("high_quality", "conservative")
+
+    # Size score as a piecewise-linear function of reduction % (favor moderate reductions)
+    REDUCTION_SCORE_XP: Tuple[float, ...] = (0.0, 5.0, 50.0, 80.0, 100.0)
+    REDUCTION_SCORE_FP: Tuple[float, ...] = (70.0, 80.0, 100.0, 80.0, 0.0)
+    # Tie-breaking preference for the safer strategies
+    METHOD_BONUS: Dict[str, float] = {"conservative": 10.0, "high_quality": 8.0, "balanced": 5.0}
+    # Below this reduction (%) the winner is trusted without a quality gate (see --always-gate)
+    GATE_MIN_REDUCTION = 15.0
+    # Per-file budget for page rasters reused across scoring and gates (original + candidates)
+    RASTER_CACHE_MAX_BYTES = 256 * 1024 * 1024
+    # Pages per Ghostscript run when streaming a whole document (no PDFium): bounds the PNGs on disk
+    RASTER_CHUNK_PAGES = 10
+    # Boosted (+6) on grayscale/bitonal content
+    ANTI_NOISE_METHODS: Tuple[str, ...] = (
+        "text_preserve",
+        "grayscale_pref",
+        "conservative",
+        "bitonal_ccitt",
+    )
+    # Strategies worth running per detected content mode (--force-all runs every applicable one)
+    STRATEGIES_BY_MODE: Dict[str, Tuple[str, ...]] = {
+        "color": ("conservative", "high_quality", "balanced", "color_text_safe", "aggressive_safe"),
+        "grayscale": (
+            "conservative",
+            "text_preserve",
+            "grayscale_pref",
+            "denoise_raster",
+            "mrc_ocr",
+        ),
+        "bitonal": ("conservative", "text_preserve", "bitonal_ccitt", "mrc_ocr"),
+    }
+    # Cheapest-first execution order; each stage only runs if _should_try() allows it
+    STAGES: Tuple[Tuple[str, ...], ...] = (
+        ("conservative",),
+        ("balanced",),
+        ("aggressive_safe",),
+        ("high_quality",),
+    )
+    # Strategies that are a single pdfwrite pass and can share one gs process (--coalesce-gs)
+    COALESCABLE_PDFWRITE: Tuple[str, ...] = (
+        "high_quality",
+        "balanced",
+        "aggressive_safe",
+        "text_preserve",
+        "grayscale_pref",
+        "color_text_safe",
+    )
+
+    def __init__(
+        self,
+        input_dir: str = "input",
+        output_dir: str = "output",
+        enable_advanced_gates: bool = False,
+        enable_telemetry: bool = True,
+        enable_anti_noise: bool = False,
+        max_workers: Optional[int] = None,
+        persistent_gs: bool = False,
+        force_all: bool = False,
+        tmpdir: Optional[str] = None,
+        batch_dedupe: bool = False,
+        coalesce_gs: bool = False,
+        max_parallel_strategies: Optional[int] = None,
+        always_gate: bool = False,
+        result_cache: bool = True,
+        stage_input: bool = False,
+        target_ratio: float = 0.8,
+        min_psnr: float = 40.0,
+    ):
+        self._log = _setup_logging()
+        # Per-PDF state (content profile, buffered log) is thread-local so files can be
+        # processed concurrently
+        self._local = threading.local()
         self.input_dir = Path(input_dir)
         self.output_dir = Path(output_dir)
         self.enable_advanced_gates = enable_advanced_gates and HAS_ADVANCED_GATES
         self.enable_telemetry = enable_telemetry and HAS_TELEMETRY
         self.enable_anti_noise = enable_anti_noise
+        self.max_workers = max_workers
+        self.max_parallel_strategies = max_parallel_strategies
+        # Default per-file strategy concurrency; process_all_pdfs divides the cores among its files
+        self._strategy_slots = os.cpu_count() or 1
+        self.always_gate = always_gate
+        self.persistent_gs = persistent_gs
+        self.force_all = force_all
+        # Staged early stop: a candidate at or under target_ratio x original size with a quick
+        # PSNR of at least min_psnr dB ends the search
+        self.target_ratio = target_ratio
+        self.min_psnr = min_psnr
+        self.batch_dedupe = batch_dedupe
+        self.coalesce_gs = coalesce_gs
+        # Copy each input into its work dir once so every strategy reads it from scratch storage
+        self.stage_input = stage_input
+        # Candidate PDFs go here; None means /dev/shm when roomy enough, else the platform default
+        self.tmpdir = tmpdir or os.environ.get("PDF_COMPRESS_TMP") or None
+        self._gs_workers: Dict[str, _GsWorker] = {}
+        self._gs_workers_lock = threading.Lock()
+        # Per-file slices of the --batch-dedupe pass, consumed as extra candidates
+        self._batch_candidates: Dict[Path, Path] = {}
+        # Input hash -> prior output/result (see _result_key); in-flight keys let duplicates wait
+        self.result_cache = result_cache
+        self._results: Dict[str, Dict[str, Any]] = {}
+        self._results_lock = threading.Lock()
+        self._results_inflight: Dict[str, threading.Event] = {}
 
         # Ensure directories exist
         self.input_dir.mkdir(exist_ok=True)
         self.output_dir.mkdir(exist_ok=True)
 
         # Detect tools on PATH and common locations (macOS/Homebrew)
-        self.tools = self._detect_tools()
+        tools, gs_version = self._detect_tools_cached(os.environ.get("PATH", ""), sys.platform)
+        self.tools = dict(tools)
+        # Raw version string for display; the parsed tuple is for comparisons only
+        self.gs_version_str = gs_version
+        self.gs_version = self._parse_version(gs_version)
         
         # Initialize advanced quality gates if enabled
         self.quality_checker = None
         if self.enable_advanced_gates:
             try:
-                self.quality_checker = QualityGateChecker()
-                print("🔬 Advanced quality gates enabled (PSNR + SSIM + LPIPS)")
+                self.quality_checker = QualityGateChecker(
+                    renderer=self._render_pages_rgb if HAS_PDFIUM else None
+                )
+                self.log.info("🔬 Advanced quality gates enabled (PSNR + SSIM + LPIPS)")
             except Exception as e:
-                print(f"⚠️  Advanced quality gates failed to initialize: {e}")
+                self.log.warning(f"⚠️  Advanced quality gates failed to initialize: {e}")
                 self.enable_advanced_gates = False
 
         # Initialize anonymous telemetry (attribute always present)
@@ -70,188 +801,859 @@ class PDFCompressor:
         if self.enable_telemetry:
             try:
                 self.telemetry = AnonymousTelemetry()
-                print("📊 Anonymous telemetry enabled for algorithm improvement")
+                self.log.info("📊 Anonymous telemetry enabled for algorithm improvement")
             except Exception as e:
-                print(f"⚠️  Telemetry failed to initialize: {e}")
+                self.log.warning(f"⚠️  Telemetry failed to initialize: {e}")
                 self.enable_telemetry = False
 
-        print("🚀 PDF ULTRA COMPRESSOR (v1)")
-        print(f"📁 Input:  {self.input_dir.absolute()}")
-        print(f"📁 Output: {self.output_dir.absolute()}")
+        self.log.info("🚀 PDF ULTRA COMPRESSOR (v1)")
+        self.log.info(f"📁 Input:  {self.input_dir.absolute()}")
+        self.log.info(f"📁 Output: {self.output_dir.absolute()}")
         if not self.enable_advanced_gates and HAS_ADVANCED_GATES:
-            print("💡 Tip: Use --advanced-gates for SSIM/LPIPS quality assessment")
+            self.log.info("💡 Tip: Use --advanced-gates for SSIM/LPIPS quality assessment")
         if self.enable_anti_noise:
-            print("🧼 Anti-noise mode: text/gray-safe filters enabled")
-        print()
+            self.log.info("🧼 Anti-noise mode: text/gray-safe filters enabled")
+        self.log.info("")
         self._print_tools()
 
     # ---------- tooling ----------
-    def _detect_tools(self) -> Dict[str, Optional[str]]:
-        tools: Dict[str, Optional[str]] = {"gs": None, "qpdf": None, "pdftk": None}
-
-        # Ghostscript: typical Homebrew and system paths
-        candidates = [
-            "/opt/homebrew/bin/gs",
-            "/usr/local/bin/gs",
-            "/opt/homebrew/Cellar/ghostscript/*/bin/gs",
-            "ghostscript",
-            "gs",
-        ]
+    @staticmethod
+    @functools.lru_cache(maxsize=4)
+    def _detect_tools_cached(
+        path_env: str, platform: str
+    ) -> Tuple[Dict[str, Optional[str]], Optional[str]]:
+        """Tool paths and Ghostscript version, memoized per process and persisted across runs.
+
+        Keyed on $PATH (and platform) so repeated constructions in one process are free;
+        the on-disk cache also records binary mtimes so an upgraded tool is re-probed.
+        """
+        path_key = hashlib.sha256(f"{platform}\0{path_env}".encode()).hexdigest()
+        cached = PDFCompressor._load_cached_tools(path_key)
+        if cached is not None:
+            return cached
+        tools = PDFCompressor._probe_tools()
+        gs_version = PDFCompressor._probe_gs_version(tools["gs"]) if tools.get("gs") else None
+        try:
+            TOOLS_CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+            TOOLS_CACHE_FILE.write_text(json.dumps({
+                "path_key": path_key,
+                "tools": tools,
+                "mtimes": {name: Path(p).stat().st_mtime_ns for name, p in tools.items() if p},
+                "gs_version": gs_version,
+            }))
+        except OSError:
+            pass
+        return tools, gs_version
+
+    @staticmethod
+    def _load_cached_tools(
+        path_key: str,
+    ) -> Optional[Tuple[Dict[str, Optional[str]], Optional[str]]]:
+        try:
+            if time.time() - TOOLS_CACHE_FILE.stat().st_mtime > TOOLS_CACHE_TTL_S:
+                return None
+            data = json.loads(TOOLS_CACHE_FILE.read_text())
+        except (OSError, ValueError):
+            return None
+        tools = data.get("tools") if data.get("path_key") == path_key else None
+        mtimes = data.get("mtimes")
+        if not isinstance(tools, dict) or not isinstance(mtimes, dict):
+            return None
+        # A tool uninstalled, upgraded or newly installed since the cache was written invalidates it
+        for name, p in tools.items():
+            if p:
+                try:
+                    if Path(p).stat().st_mtime_ns != mtimes.get(name):
+                        return None
+                except OSError:
+                    return None
+        if any(PDFCompressor._which_all([name for name, p in tools.items() if not p]).values()):
+            return None
+        version = data.get("gs_version")
+        if version is not None and not isinstance(version, str):
+            return None
+        return tools, version
+
+    @staticmethod
+    def _probe_tools() -> Dict[str, Optional[str]]:
+        found = PDFCompressor._which_all(["ghostscript", "gs", "qpdf", "pdftk", "ocrmypdf"])
+        return {
+            "gs": PDFCompressor._find_ghostscript(found["ghostscript"] or found["gs"]),
+            "qpdf": found["qpdf"],
+            "pdftk": found["pdftk"],
+            "ocrmypdf": found["ocrmypdf"],
+        }
+
+    @staticmethod
+    def _which_all(names: List[str]) -> Dict[str, Optional[str]]:
+        """shutil.which for several names in one walk over $PATH (first match per name wins)."""
+        found: Dict[str, Optional[str]] = dict.fromkeys(names)
+        for d in os.environ.get("PATH", "").split(os.pathsep):
+            pending = [n for n, p in found.items() if p is None]
+            if not pending:
+                break
+            for name in pending:
+                for cand in (
+                    name,
+                    *(name + ext for ext in os.environ.get("PATHEXT", "").split(os.pathsep) if ext),
+                ):
+                    full = os.path.join(d or os.curdir, cand)
+                    if os.path.isfile(full) and os.access(full, os.X_OK):
+                        found[name] = full
+                        break
+        return found
+
+    @staticmethod
+    @functools.lru_cache(maxsize=None)
+    def _find_ghostscript(on_path: Optional[str] = None) -> Optional[str]:
+        """Resolve Ghostscript from typical Homebrew/system paths, then on_path (its $PATH lookup).
+
+        Candidates are consumed lazily so the Cellar glob is only walked when the fixed
+        paths miss; the result is shared by every compressor instance in the process.
+        """
+        fixed = (Path("/opt/homebrew/bin/gs"), Path("/usr/local/bin/gs"))
+        cellar = Path("/opt/homebrew/Cellar/ghostscript").glob("*/bin/gs")
+        found = next((p for p in chain(fixed, cellar) if p.exists()), None)
+        if found is not None:
+            return str(found)
+        return on_path
+
+    @staticmethod
+    def _probe_gs_version(gs: str) -> Optional[str]:
+        try:
+            r = subprocess.run(
+                [gs, "--version"],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                text=True,
+                timeout=10,
+                **_SPAWN_KW,
+            )
+            if r.returncode != 0:
+                return None
+            return r.stdout.strip().split("\n")[0] or None
+        except (OSError, subprocess.SubprocessError):
+            return None
 
-        for path in candidates:
-            if "*" in path:
-                import glob
-                matches = glob.glob(path)
-                if matches:
-                    tools["gs"] = matches[0]
-                    break
-            else:
-                p = shutil.which(path) if not Path(path).exists() else path
-                if p:
-                    tools["gs"] = str(p)
-                    break
+    @staticmethod
+    def _parse_version(version: Optional[str]) -> Optional[Tuple[int, ...]]:
+        """"10.05.0" -> (10, 5, 0); None when there is no leading dotted number."""
+        m = re.match(r"\d+(?:\.\d+)*", version or "")
+        return tuple(int(n) for n in m.group().split(".")) if m else None
+
+    @staticmethod
+    @functools.lru_cache(maxsize=None)
+    def _probe_qpdf_version(qpdf: str) -> Optional[Tuple[int, ...]]:
+        try:
+            r = subprocess.run(
+                [qpdf, "--version"],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                text=True,
+                timeout=10,
+                **_SPAWN_KW,
+            )
+            if r.returncode != 0:
+                return None
+            # "qpdf version 11.10.1"
+            return tuple(int(n) for n in r.stdout.split("\n")[0].split()[-1].split("."))
+        except (OSError, ValueError, IndexError, subprocess.SubprocessError):
+            return None
+
+    @staticmethod
+    def _libqpdf_version() -> Optional[Tuple[int, ...]]:
+        """Version of the libqpdf pikepdf runs jobs on."""
+        try:
+            return tuple(int(n) for n in pikepdf.__libqpdf_version__.split("."))
+        except (AttributeError, ValueError):
+            return None
+
+    @staticmethod
+    @functools.lru_cache(maxsize=None)
+    def _qpdf_has_zopfli(qpdf: str) -> bool:
+        try:
+            r = subprocess.run(
+                [qpdf, "--zopfli"],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                text=True,
+                timeout=10,
+                **_SPAWN_KW,
+            )
+            return r.returncode == 0 and "zopfli support is enabled" in r.stdout
+        except (OSError, subprocess.SubprocessError):
+            return False
+
+    @staticmethod
+    def _qpdf_stream_args(version: Optional[Tuple[int, ...]]) -> List[str]:
+        """Switches for the conservative qpdf pass.
 
-        tools["qpdf"] = shutil.which("qpdf")
-        tools["pdftk"] = shutil.which("pdftk")
-        tools["ocrmypdf"] = shutil.which("ocrmypdf")
-        return tools
+        From 11.10 on, qpdf recompresses every Flate stream at level 9 (via zopfli when the
+        build has it and QPDF_ZOPFLI is set) and skips --optimize-images, whose image rescan
+        is slow and rarely gains anything on already-optimized files.
+        """
+        if version is not None and version[:2] >= (11, 10):
+            return [
+                "--compress-streams=y",
+                "--recompress-flate",
+                "--compression-level=9",
+                "--object-streams=generate",
+            ]
+        return ["--optimize-images", "--compress-streams=y", "--object-streams=generate"]
+
+    @property
+    def _gs_legacy_pdf_switch(self) -> bool:
+        """Whether -dNEWPDF=false is available and should be used for pdfwrite.
+
+        Ghostscript 10.0 made the new C PDF interpreter the default, which regresses
+        size and speed when re-optimizing many inputs (asciidoctor-pdf pins the old one
+        for the same reason). The switch was dropped in 10.03 along with the old
+        interpreter, so it only applies to 10.00-10.02.
+        """
+        return self.gs_version is not None and (10, 0) <= self.gs_version[:2] < (10, 3)
+
+    def _run_pdfwrite(
+        self,
+        variant: str,
+        args: Sequence[str],
+        pdf: Path,
+        out: Path,
+        timeout: int = 300,
+        new_interpreter: bool = False,
+    ) -> bool:
+        """Run a Ghostscript pdfwrite pass, reusing a persistent interpreter when enabled.
+
+        Falls back to a one-shot process when the variant's worker is busy with another file.
+        """
+        if self._gs_legacy_pdf_switch and not new_interpreter:
+            args = ["-dNEWPDF=false", *args]
+        elif new_interpreter:
+            variant = f"{variant}_newpdf"
+        session = getattr(self._local, "pdfwrite_session", None)
+        if session is not None and not new_interpreter:
+            if session.submit(variant, args, out):
+                return self._produced(out)
+        worker = self._gs_worker(variant, args) if self.persistent_gs else None
+        if worker is not None and worker.lock.acquire(blocking=False):
+            try:
+                return worker.run(pdf, out, timeout) and self._produced(out)
+            finally:
+                worker.lock.release()
+        cmd = [self.tools["gs"], *args, f"-sOutputFile={out}", str(pdf)]
+        r = _run_silent(cmd, timeout=timeout)
+        return r.returncode == 0 and self._produced(out)
+
+    def _render_pdfwrite_session(
+        self, pdf: Path, jobs: List[Tuple[str, Sequence[str], Path]]
+    ) -> Set[str]:
+        """Render several pdfwrite passes of one input in a single gs process.
+
+        Returns the variants that succeeded.
+
+        Distiller params are reset to the device defaults before each pass so settings
+        from one variant don't leak into the next.
+        """
+        pdf = Path(os.path.abspath(pdf))
+        scratch = Path(os.path.abspath(self._temp_path("_session.pdf")))
+        outs = [Path(os.path.abspath(out)) for _, _, out in jobs]
+        lines = ["/PDFUC_defaults currentdistillerparams def"]
+        for (variant, args, _), out in zip(jobs, outs):
+            preset, distiller, device = _pdfwrite_ps_settings(args)
+            device = {
+                "OutputFile": f"({_ps_string(out)})",
+                "ProcessColorModel": "/DeviceRGB",
+                **device,
+            }
+            body = [f"{_ps_dict(device)} setpagedevice", "PDFUC_defaults setdistillerparams"]
+            if preset:
+                body.append(f".distillersettings {preset} get setdistillerparams")
+            body.append(f"{_ps_dict(distiller)} setdistillerparams")
+            body.append(f"({_ps_string(pdf)}) run")
+            lines.append(
+                f"{{ {' '.join(body)} }} stopped "
+                f"{{ (%%PDFUC-FAIL {variant}\\n) print flush }} if clear"
+            )
+        lines.append(f"<< /OutputFile ({_ps_string(scratch)}) >> setpagedevice")
+        switches = ["-dNEWPDF=false"] if self._gs_legacy_pdf_switch else []
+        permits = _gs_permit_args([str(pdf)], [*map(str, outs), str(scratch)])
+        cmd = [
+            self.tools["gs"], "-q", "-dSAFER", *permits, "-dBATCH", "-dNOPAUSE", *switches,
+            "-sDEVICE=pdfwrite", f"-sOutputFile={scratch}", "-",
+        ]
+        try:
+            r = subprocess.run(
+                cmd,
+                input="\n".join(lines).encode(),
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                timeout=300 * len(jobs),
+                **_SPAWN_KW,
+            )
+        except subprocess.TimeoutExpired:
+            return set()
+        finally:
+            self._discard_candidate(scratch)
+        if r.returncode != 0:
+            return set()
+        return {
+            variant for variant, _, out in jobs
+            if f"%%PDFUC-FAIL {variant}\n".encode() not in r.stdout and self._produced(out)
+        }
+
+    def _gs_worker(self, variant: str, args: Sequence[str]) -> Optional[_GsWorker]:
+        with self._gs_workers_lock:
+            worker = self._gs_workers.get(variant)
+            if worker is not None and worker.alive:
+                return worker
+            try:
+                worker = _GsWorker(
+                    self.tools["gs"], args, self.tmpdir, *self._gs_worker_permits()
+                )
+            except Exception as e:
+                self.log.warning(f"  ⚠️  Persistent Ghostscript unavailable ({variant}): {e}")
+                return None
+            self._gs_workers[variant] = worker
+            return worker
+
+    def _gs_worker_permits(self) -> Tuple[List[str], List[str]]:
+        """Paths a persistent worker may read and write: the input dir, and the per-file work
+        dirs (inputs are staged there and candidates land there) under every scratch root."""
+        roots = {self.tmpdir, str(RAMDISK_DIR), tempfile.gettempdir()}
+        workdirs = [os.path.join(root, "pdfuc-*") for root in roots if root]
+        return [os.path.join(self.input_dir, "*"), *workdirs], workdirs
+
+    def close(self) -> None:
+        """Shut down persistent Ghostscript workers."""
+        with self._gs_workers_lock:
+            workers, self._gs_workers = list(self._gs_workers.values()), {}
+        for worker in workers:
+            worker.close()
 
     def _print_tools(self) -> None:
-        print("🔧 DETECTED TOOLS:")
+        self.log.info("🔧 DETECTED TOOLS:")
         # Ghostscript
         if self.tools["gs"]:
-            try:
-                r = subprocess.run([self.tools["gs"], "--version"], capture_output=True, text=True)
-                v = r.stdout.strip().split("\n")[0] if r.returncode == 0 else "unknown"
-                print(f"  ✅ Ghostscript: {self.tools['gs']} (v{v})")
-            except Exception:
-                print(f"  ⚠️  Ghostscript: {self.tools['gs']} (version unknown)")
+            if self.gs_version:
+                self.log.info(f"  ✅ Ghostscript: {self.tools['gs']} (v{self.gs_version_str})")
+                if self._gs_legacy_pdf_switch:
+                    self.log.info(
+                        "     ↳ using the legacy PDF interpreter for pdfwrite (-dNEWPDF=false)"
+                    )
+            else:
+                self.log.warning(f"  ⚠️  Ghostscript: {self.tools['gs']} (version unknown)")
         else:
-            print("  ❌ Ghostscript: Not found")
+            self.log.warning("  ❌ Ghostscript: Not found")
 
         # qpdf
-        print(f"  {'✅' if self.tools['qpdf'] else '❌'} qpdf: {self.tools['qpdf'] or 'Not found'}")
+        self.log.info(
+            f"  {'✅' if self.tools['qpdf'] else '❌'} qpdf: {self.tools['qpdf'] or 'Not found'}"
+        )
+        if self.tools["qpdf"] and self._qpdf_has_zopfli(self.tools["qpdf"]):
+            zopfli = (
+                "on"
+                if os.environ.get("QPDF_ZOPFLI")
+                else "set QPDF_ZOPFLI=on to use it for smaller streams"
+            )
+            self.log.info(f"     ↳ built with zopfli ({zopfli})")
+        if HAS_PIKEPDF:
+            self.log.info(f"  ✅ pikepdf: v{pikepdf.__version__} (in-process qpdf)")
         # pdftk (optional)
-        print(f"  {'✅' if self.tools['pdftk'] else '❌'} PDFtk: {self.tools['pdftk'] or 'Not found'}")
+        self.log.info(
+            f"  {'✅' if self.tools['pdftk'] else '❌'} PDFtk: "
+            f"{self.tools['pdftk'] or 'Not found'}"
+        )
         # ocrmypdf (optional)
-        print(f"  {'✅' if self.tools.get('ocrmypdf') else '❌'} OCRmyPDF: {self.tools.get('ocrmypdf') or 'Not found'}\n")
+        self.log.info(
+            f"  {'✅' if self.tools.get('ocrmypdf') else '❌'} OCRmyPDF: "
+            f"{self.tools.get('ocrmypdf') or 'Not found'}\n"
+        )
 
     # ---------- main flow ----------
     def process_all_pdfs(self) -> List[Dict]:
-        pdfs = list(self.input_dir.glob("*.pdf"))
+        # Largest first: long jobs start early and small ones fill the gaps at the end
+        with os.scandir(self.input_dir) as it:
+            entries = [e for e in it if e.is_file() and e.name.lower().endswith(".pdf")]
+        # DirEntry caches its stat: these sizes are reused as each file's original size
+        sizes = {Path(e.path): e.stat().st_size for e in entries}
+        pdfs = sorted(sizes, key=sizes.__getitem__, reverse=True)
         if not pdfs:
-            print("⚠️  No PDF files found in input/")
+            self.log.warning("⚠️  No PDF files found in input/")
             return []
 
-        print(f"🔍 Found {len(pdfs)} PDF file(s)")
-        results: List[Dict] = []
-
-        for pdf in pdfs:
-            print(f"\n🚀 PROCESSING: {pdf.name}")
-            print("=" * 60)
-            res = self.compress_pdf(pdf)
-            results.append(res)
+        self.log.info(f"🔍 Found {len(pdfs)} PDF file(s)")
+        # Ghostscript/qpdf run in subprocesses and release the GIL, so threads are enough
+        workers = self.max_workers or min(len(pdfs), os.cpu_count() or 1)
+        # Files and their strategies share the cores: N files x cpu_count gs passes
+        # would oversubscribe
+        self._strategy_slots = max(1, (os.cpu_count() or 1) // max(1, workers))
+        results: List[Optional[Dict]] = [None] * len(pdfs)
+
+        if self.result_cache:
+            self._results = self._load_result_cache()
+        if self.batch_dedupe:
+            self._batch_candidates = self._batch_dedupe_gs(pdfs)
+
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            futures = {
+                pool.submit(self._process_one, pdf, sizes[pdf]): i for i, pdf in enumerate(pdfs)
+            }
+            for done, fut in enumerate(as_completed(futures), start=1):
+                results[futures[fut]] = fut.result()
+                self.log.info(f"📦 Progress: {done}/{len(pdfs)}")
+        for leftover in self._batch_candidates.values():
+            self._discard_candidate(leftover)
+        self._batch_candidates = {}
+        if self.result_cache:
+            self._save_result_cache()
+        self.close()
+
+        return [r for r in results if r is not None]
+
+    def _process_one(self, pdf: Path, size: Optional[int] = None) -> Dict:
+        # Buffer this file's output and emit it as one block, so parallel files don't interleave
+        buffer = logging.handlers.MemoryHandler(
+            capacity=1000, flushLevel=logging.CRITICAL, target=self._log.handlers[0]
+        )
+        pdf_log = logging.Logger(f"{self._log.name}.{pdf.name}", level=self._log.level)
+        pdf_log.addHandler(buffer)
+        self._local.log = pdf_log
+        try:
+            self.log.info(f"\n🚀 PROCESSING: {pdf.name}")
+            self.log.info("=" * 60)
+            key = self._result_key(pdf) if self.result_cache else None
+            res = self._reuse_result(key, pdf) if key else None
+            if res is None:
+                try:
+                    res = self.compress_pdf(pdf, size)
+                finally:
+                    if key:
+                        self._store_result(key, pdf, res)
             self._move_processed_file(pdf)
+            return res
+        finally:
+            self._local.log = None
+            buffer.close()
 
-        return results
+    def _output_path(self, pdf: Path) -> Path:
+        return self.output_dir / f"{pdf.stem}_optimized.pdf"
 
-    def compress_pdf(self, pdf_path: Path) -> Dict:
-        original_mb = pdf_path.stat().st_size / (1024 * 1024)
-        output_name = self.output_dir / f"{pdf_path.stem}_optimized.pdf"
+    # ---------- result cache ----------
+    @staticmethod
+    def _sha256(path: Path) -> str:
+        with open(path, "rb") as f:
+            return hashlib.file_digest(f, "sha256").hexdigest()
 
-        print(f"📊 Original size: {original_mb:.2f} MB")
+    def _result_key(self, pdf: Path) -> Optional[str]:
+        """SHA-256 of the input plus every option and tool that changes the output.
 
-        candidates: List[Tuple[str, Path]] = []
+        None if the input is unreadable.
+        """
+        try:
+            digest = self._sha256(pdf)
+        except OSError:
+            return None
+        options = [
+            name for name, on in (
+                ("advanced_gates", self.enable_advanced_gates),
+                ("anti_noise", self.enable_anti_noise),
+                ("force_all", self.force_all),
+                ("always_gate", self.always_gate),
+                ("batch_dedupe", self.batch_dedupe),
+            ) if on
+        ]
+        if (self.target_ratio, self.min_psnr) != (0.8, 40.0):
+            options.append(f"early_stop={self.target_ratio:g}/{self.min_psnr:g}")
+        gs = self.gs_version_str or "none"
+        # A result built with a different tool set may not be the one this run would pick
+        tools = sorted(name for name, path in self.tools.items() if path) + [
+            name
+            for name, on in (
+                ("pikepdf", HAS_PIKEPDF),
+                ("pdfium", HAS_PDFIUM),
+                ("img2pdf", HAS_IMG2PDF),
+                ("cv2", HAS_CV2),
+            )
+            if on
+        ]
+        return f"{digest}:{','.join(options)}:gs{gs}:{'+'.join(tools)}"
+
+    def _reuse_result(self, key: str, pdf: Path) -> Optional[Dict]:
+        """Hardlink a prior output for identical input; None means this worker must compress it."""
+        with self._results_lock:
+            entry = self._results.get(key)
+            pending = self._results_inflight.get(key) if entry is None else None
+            if entry is None and pending is None:
+                self._results_inflight[key] = threading.Event()
+                return None
+        if pending is not None:
+            # An identical file is being compressed right now: wait for its result
+            pending.wait()
+            with self._results_lock:
+                entry = self._results.get(key)
+            if entry is None:
+                return None
 
-        # Anonymous telemetry: analyze document to get anonymous ID
-        doc_id: Optional[str] = None
+        src = Path(entry["output"])
+        dst = self._output_path(pdf)
+        try:
+            if src.stat().st_size != entry["size"] or self._sha256(src) != entry.get("sha256"):
+                return None
+            if not (dst.exists() and os.path.samefile(src, dst)):
+                self._link_or_copy(src, dst, entry["size"])
+        except OSError:
+            return None
+        self.log.info(f"♻️  Identical input already compressed: reusing {src.name}")
+        result = dict(entry["result"], original_file=pdf.name, final_file=dst.name)
         if self.enable_telemetry and self.telemetry is not None:
             try:
-                doc_id = self.telemetry.analyze_document(pdf_path)
+                self.telemetry.record_compression_result(
+                    self.telemetry.analyze_document(pdf), result
+                )
             except Exception as e:
-                print(f"⚠️  Telemetry analyze failed: {e}")
+                self.log.warning(f"⚠️  Telemetry record failed: {e}")
+        return result
+
+    def _store_result(self, key: str, pdf: Path, res: Optional[Dict]) -> None:
+        """Record pdf's result under key (unless it failed) and release waiting duplicates."""
+        output = self._output_path(pdf)
+        entry = None
+        if res is not None and "error" not in res:
+            try:
+                # Hashed outside the lock: other workers keep looking up the cache meanwhile
+                entry = {
+                    "output": str(output.resolve()),
+                    "size": output.stat().st_size,
+                    "sha256": self._sha256(output),
+                    "result": res,
+                }
+            except OSError:
+                pass
+        with self._results_lock:
+            if entry is not None:
+                self._results[key] = entry
+            pending = self._results_inflight.pop(key, None)
+        if pending is not None:
+            pending.set()
+
+    @staticmethod
+    def _load_result_cache() -> Dict[str, Dict[str, Any]]:
+        try:
+            data = json.loads(RESULTS_CACHE_FILE.read_text())
+        except (OSError, ValueError):
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def _save_result_cache(self) -> None:
+        # Merge with entries other runs wrote meanwhile; drop entries whose output is gone
+        merged = self._load_result_cache()
+        merged.update(self._results)
+        merged = {
+            k: v
+            for k, v in merged.items()
+            if isinstance(v, dict) and Path(v.get("output", "")).is_file()
+        }
+        try:
+            RESULTS_CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+            tmp = RESULTS_CACHE_FILE.with_suffix(f".{os.getpid()}.tmp")
+            tmp.write_text(json.dumps(merged))
+            os.replace(tmp, RESULTS_CACHE_FILE)
+        except OSError:
+            pass
+
+    @property
+    def log(self) -> logging.Logger:
+        """The current file's buffered logger inside a worker, else the shared one."""
+        return getattr(self._local, "log", None) or self._log
+
+    def _run_strategies(
+        self,
+        pdf_path: Path,
+        plan: List[Tuple[str, Callable[[Path], Optional[Path]]]],
+    ) -> List[Tuple[str, Path, int]]:
+        """Run independent strategies concurrently; wall time ≈ slowest strategy, not the sum.
 
-        # Content-type detection to auto-enable anti-noise on grayscale/bitonal docs
+        Candidates carry the size taken by a single stat() here; later stages never re-stat them.
+        """
+        if not plan:
+            return []
+        coalesced = [name for name, _ in plan if name in self.COALESCABLE_PDFWRITE]
+        if self.coalesce_gs and not self.persistent_gs and len(coalesced) > 1:
+            self._local.pdfwrite_session = _PdfwriteSession(
+                len(coalesced), functools.partial(self._render_pdfwrite_session, pdf_path)
+            )
+        session = getattr(self._local, "pdfwrite_session", None) if coalesced else None
+        run = self._in_worker(lambda strategy: strategy(pdf_path))
+        self._local.pdfwrite_session = None
+
+        # Each gs pass can take a lot of RAM on large PDFs; --max-parallel-strategies caps this
+        workers = max(1, min(len(plan), self.max_parallel_strategies or self._strategy_slots))
+        if session is not None:
+            # Session members block on each other, so they all need a thread
+            workers = len(plan)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [(name, pool.submit(run, strategy)) for name, strategy in plan]
+
+        candidates: List[Tuple[str, Path, int]] = []
+        for name, fut in futures:
+            try:
+                out = fut.result()
+                size = out.stat().st_size if out else 0
+            except Exception as e:
+                self.log.warning(f"  ❌ {name} error: {e}")
+                continue
+            if out:
+                self.log.info(f"  ✅ {name}: {size / (1024*1024):.2f} MB")
+                candidates.append((name, out, size))
+        return candidates
+
+    def _in_worker(self, fn: Callable[..., Any]) -> Callable[..., Any]:
+        """Wrap fn so a worker thread runs it with the caller's per-PDF state
+        (profile, log, work dir)."""
+        state = dict(vars(self._local))
+
+        def run(*args: Any) -> Any:
+            vars(self._local).update(state)
+            return fn(*args)
+
+        return run
+
+    def _run_staged(
+        self,
+        pdf_path: Path,
+        plan: List[Tuple[str, Callable[[Path], Optional[Path]]]],
+        original_size: int,
+    ) -> List[Tuple[str, Path, int]]:
+        """Run the plan cheapest-first in STAGES, stopping once a heavier stage is unlikely to win.
+
+        Strategies outside STAGES run alongside "balanced". Candidates come back in plan
+        order so selection tie-breaking is unchanged. SAFER_ALTERNATIVES an early stop skips
+        are deferred until a quality gate needs them. --force-all bypasses this.
+        """
+        staged = {name for stage in self.STAGES for name in stage}
+        stages = [[(n, fn) for n, fn in plan if n in stage] for stage in self.STAGES]
+        stages[1] += [(n, fn) for n, fn in plan if n not in staged]
+
+        candidates: List[Tuple[str, Path, int]] = []
+        reductions: Dict[str, float] = {}
+        stage_best: List[float] = []
+        active = [stage for stage in stages if stage]
+        ran: Set[str] = set()
+        for i, stage in enumerate(active):
+            if i > 0 and not self._should_try(stage[0][0], reductions, stage_best):
+                self.log.info(
+                    f"⏩ Early stop: skipping {', '.join(n for st in active[i:] for n, _ in st)}"
+                )
+                break
+            produced = self._run_strategies(pdf_path, stage)
+            ran.update(name for name, _ in stage)
+            candidates += produced
+            for name, _, size in produced:
+                reductions[name] = (
+                    (original_size - size) / original_size * 100 if original_size else 0.0
+                )
+            best_name, best_file, _ = max(
+                produced, key=lambda c: reductions[c[0]], default=(None, None, 0)
+            )
+            stage_best.append(max(stage_best[-1:] + [reductions.get(best_name, 0.0)]))
+            # Cheap 1-page/100 dpi PSNR: a clearly good, clearly smaller candidate ends the search
+            if best_file is not None and reductions[best_name] >= (1.0 - self.target_ratio) * 100:
+                try:
+                    psnr = self._compute_average_psnr(
+                        pdf_path, best_file, pages=1, dpi=100, downscale=1
+                    )
+                except Exception as e:
+                    self.log.warning(f"  ⚠️  Early-stop PSNR check failed: {e}")
+                    psnr = None
+                if psnr is not None and psnr >= self.min_psnr:
+                    self.log.info(
+                        f"⏩ Early stop: {best_name} is {reductions[best_name]:.1f}% smaller "
+                        f"at {psnr:.1f} dB"
+                    )
+                    break
+
+        self._local.deferred_alternatives = [
+            (name, fn) for name, fn in plan if name in self.SAFER_ALTERNATIVES and name not in ran
+        ]
+        order = {name: i for i, (name, _) in enumerate(plan)}
+        return sorted(candidates, key=lambda c: order[c[0]])
+
+    def _run_deferred_alternatives(
+        self, pdf_path: Path, candidates: List[Tuple[str, Path, int]]
+    ) -> None:
+        """Run the SAFER_ALTERNATIVES an early stop skipped, adding them to candidates in place."""
+        deferred = getattr(self._local, "deferred_alternatives", None)
+        if not deferred:
+            return
+        self._local.deferred_alternatives = []
+        names = ", ".join(name for name, _ in deferred)
+        self.log.info(f"🛡️  Running skipped fallback(s): {names}")
+        candidates += self._run_strategies(pdf_path, deferred)
+
+    def _should_try(
+        self, next_method: str, reductions: Dict[str, float], stage_best: List[float]
+    ) -> bool:
+        """Whether next_method can plausibly beat what the earlier stages produced."""
+        if reductions.get("conservative", 0.0) >= 30.0:
+            return False
+        # Diminishing returns: the previous stage gained < 3 points over the one before it
+        if len(stage_best) >= 2 and stage_best[-1] - stage_best[-2] < 3.0:
+            return False
+        return True
+
+    @property
+    def _content_profile(self) -> Optional[Dict[str, Any]]:
+        return getattr(self._local, "content_profile", None)
+
+    @_content_profile.setter
+    def _content_profile(self, value: Optional[Dict[str, Any]]) -> None:
+        self._local.content_profile = value
+
+    def compress_pdf(self, pdf_path: Path, original_size: Optional[int] = None) -> Dict:
+        if original_size is None:
+            original_size = pdf_path.stat().st_size
+        self._local.input_size = original_size
+        if not self.stage_input:
+            self._prefetch(pdf_path)
+        # Every intermediate of this file goes into one private dir that is removed
+        # in one go when the file is done, errors included
+        try:
+            with tempfile.TemporaryDirectory(prefix="pdfuc-", dir=self._scratch_dir()) as workdir:
+                self._local.workdir = workdir
+                self._local.raster_cache = _RasterCache(self.RASTER_CACHE_MAX_BYTES)
+                self._local.deferred_alternatives = []
+                try:
+                    source = (
+                        self._stage_input(pdf_path, Path(workdir)) if self.stage_input else pdf_path
+                    )
+                    return self._compress_pdf(pdf_path, original_size, source)
+                finally:
+                    self._local.workdir = None
+                    self._local.raster_cache = None
+                    self._local.deferred_alternatives = []
+        finally:
+            # Nothing reads this input again: drop its pages instead of letting a large batch
+            # push more useful cache (gs, candidates, other inputs) out
+            self._fadvise(pdf_path, "POSIX_FADV_DONTNEED")
+
+    def _stage_input(self, pdf_path: Path, workdir: Path) -> Path:
+        """Copy the input into the work dir (tmpfs when roomy) with one sequential read.
+
+        Every strategy, rasterization and gate then reads the copy instead of the input
+        volume; useful for network mounts and spinning disks. Falls back to the input itself.
+        """
+        staged = workdir / pdf_path.name
+        try:
+            self._fadvise(pdf_path, "POSIX_FADV_SEQUENTIAL")
+            shutil.copyfile(pdf_path, staged)
+            return staged
+        except OSError as e:
+            self.log.warning(f"⚠️  Could not stage input in {workdir}: {e}")
+            return pdf_path
+
+    def _compress_pdf(
+        self, pdf_path: Path, original_size: int, source: Optional[Path] = None
+    ) -> Dict:
+        # source is the copy that strategies read (see _stage_input); pdf_path names the output
+        source = source or pdf_path
+        original_mb = original_size / (1024 * 1024)
+        output_name = self._output_path(pdf_path)
+
+        self.log.info(f"📊 Original size: {original_mb:.2f} MB")
+
+        candidates: List[Tuple[str, Path, int]] = []
+
+        # Content-type detection (a gs rasterization) runs while telemetry parses the file
         self._content_profile = None  # type: ignore
+        doc_id: Optional[str] = None
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            profile_future = pool.submit(self._in_worker(self._detect_content_profile), source)
+
+            # Anonymous telemetry: analyze document to get anonymous ID
+            if self.enable_telemetry and self.telemetry is not None:
+                try:
+                    doc_id = self.telemetry.analyze_document(pdf_path)
+                except Exception as e:
+                    self.log.warning(f"⚠️  Telemetry analyze failed: {e}")
+
+        # Content-type detection to auto-enable anti-noise on grayscale/bitonal docs
         use_anti_noise = self.enable_anti_noise
         try:
-            profile = self._detect_content_profile(pdf_path)
+            profile = profile_future.result()
             self._content_profile = profile
             if not use_anti_noise and profile and profile.get('mode') in ('grayscale', 'bitonal'):
                 use_anti_noise = True
-                print(f"🧠 Auto anti-noise: detected {profile.get('mode')} content")
+                self.log.info(f"🧠 Auto anti-noise: detected {profile.get('mode')} content")
         except Exception as e:
             # Non-fatal
             self._content_profile = None
 
         try:
-            # Strategy 1: ultra-conservative (qpdf only)
-            if self.tools["qpdf"]:
-                c1 = self._conservative_qpdf(pdf_path)
-                if c1:
-                    candidates.append(("conservative", c1))
+            # Build the strategy plan; order is kept for deterministic tie-breaking in selection
+            plan: List[Tuple[str, Callable[[Path], Optional[Path]]]] = []
+            # Strategies the user asked for by flag; the content-mode filter never drops them
+            requested: Set[str] = set()
 
-            # Strategy 2: Ghostscript high-quality
-            if self.tools["gs"]:
-                c2 = self._high_quality_gs(pdf_path)
-                if c2:
-                    candidates.append(("high_quality", c2))
+            # Strategy 1: ultra-conservative (qpdf only)
+            if self.tools["qpdf"] or HAS_PIKEPDF:
+                plan.append(("conservative", self._conservative_qpdf))
 
-            # Strategy 3: Ghostscript balanced
+            # Strategies 2/3: Ghostscript high-quality and balanced
             if self.tools["gs"]:
-                c3 = self._balanced_gs(pdf_path)
-                if c3:
-                    candidates.append(("balanced", c3))
+                plan.append(("high_quality", self._high_quality_gs))
+                plan.append(("balanced", self._balanced_gs))
 
             # Anti-noise strategies prioritize text/gray safety
             if use_anti_noise and self.tools["gs"]:
-                c_an1 = self._text_preserve_gs(pdf_path)
-                if c_an1:
-                    candidates.append(("text_preserve", c_an1))
-                c_an2 = self._grayscale_pref_gs(pdf_path)
-                if c_an2:
-                    candidates.append(("grayscale_pref", c_an2))
+                plan.append(("text_preserve", self._text_preserve_gs))
+                plan.append(("grayscale_pref", self._grayscale_pref_gs))
                 # Denoise/raster strategy when OpenCV is available
-                c_dn = self._denoise_raster(pdf_path)
-                if c_dn:
-                    candidates.append(("denoise_raster", c_dn))
+                plan.append(("denoise_raster", self._denoise_raster))
+                if self.enable_anti_noise:
+                    requested.update(("text_preserve", "grayscale_pref", "denoise_raster"))
 
             # Content-aware extra strategies based on detected mode
             prof = getattr(self, '_content_profile', None)
             if self.tools["gs"] and prof:
                 mode = prof.get('mode')
                 if mode == 'color':
-                    c_cts = self._color_text_safe_gs(pdf_path)
-                    if c_cts:
-                        candidates.append(("color_text_safe", c_cts))
+                    plan.append(("color_text_safe", self._color_text_safe_gs))
                 if mode == 'bitonal':
-                    c_bin = self._bitonal_ccitt_raster(pdf_path)
-                    if c_bin:
-                        candidates.append(("bitonal_ccitt", c_bin))
+                    plan.append(("bitonal_ccitt", self._bitonal_ccitt_raster))
             # MRC/OCR strategy using OCRmyPDF when applicable
             if self.tools.get("ocrmypdf") and (prof is None or prof.get('mode') in ("grayscale", "bitonal")):
-                c_mrc = self._mrc_ocrmypdf(pdf_path)
-                if c_mrc:
-                    candidates.append(("mrc_ocr", c_mrc))
+                plan.append(("mrc_ocr", self._mrc_ocrmypdf))
 
             # Strategy 4: Ghostscript aggressive but safe
             if self.tools["gs"]:
-                c4 = self._aggressive_safe_gs(pdf_path)
-                if c4:
-                    candidates.append(("aggressive_safe", c4))
+                plan.append(("aggressive_safe", self._aggressive_safe_gs))
+
+            if not self.force_all:
+                plan = self._plan_for_profile(plan, prof, requested)
+                plan = self._prune_plan(plan, self._classify_pdf(source, original_size))
+
+            if self.force_all:
+                candidates = self._run_strategies(source, plan)
+            else:
+                candidates = self._run_staged(source, plan, original_size)
+            batch = self._batch_candidates.pop(pdf_path, None)
+            if batch is not None:
+                candidates.append(("batch_dedupe", batch, batch.stat().st_size))
 
             # Select best result (size vs. quality heuristic + sharpness penalty)
-            best = self._select_best_result(pdf_path, candidates)
+            best = self._select_best_result(source, candidates, original_size)
 
             # Apply quality gates (PSNR + optional SSIM/LPIPS)
             if self.enable_advanced_gates and self.quality_checker:
-                best = self._apply_advanced_quality_gates(pdf_path, candidates, best)
+                best = self._apply_advanced_quality_gates(source, candidates, best)
             else:
-                best = self._apply_psnr_quality_gate(pdf_path, candidates, best)
+                best = self._apply_psnr_quality_gate(source, candidates, best)
 
+            # Losing candidates need no cleanup: they go with the work dir when compress_pdf returns
             if best:
-                shutil.copy2(best["file"], output_name)
-                final_mb = output_name.stat().st_size / (1024 * 1024)
+                # The winner is a temp file we own: rename it into place instead of copying it
+                final_size = best["size"]
+                self._finalize_output(best["file"], output_name)
+                final_mb = final_size / (1024 * 1024)
                 reduction = ((original_mb - final_mb) / original_mb) * 100 if original_mb > 0 else 0.0
 
                 result = {
@@ -267,18 +1669,19 @@ class PDFCompressor:
                     "lpips": best.get("lpips"),
                 }
 
-                print("\n🎉 COMPRESSION SUCCESS")
-                print(f"📊 {original_mb:.2f} MB → {final_mb:.2f} MB ({reduction:.1f}%)")
-                print(f"🏆 Winner: {best['method']}")
+                self.log.info("\n🎉 COMPRESSION SUCCESS")
+                self.log.info(f"📊 {original_mb:.2f} MB → {final_mb:.2f} MB ({reduction:.1f}%)")
+                self.log.info(f"🏆 Winner: {best['method']}")
                 if best.get("psnr_db") is not None:
-                    print(f"🔎 PSNR: {best['psnr_db']:.2f} dB")
+                    self.log.info(f"🔎 PSNR: {best['psnr_db']:.2f} dB")
                 if best.get("ssim") is not None:
-                    print(f"🔎 SSIM: {best['ssim']:.3f}")
+                    self.log.info(f"🔎 SSIM: {best['ssim']:.3f}")
                 if best.get("lpips") is not None:
-                    print(f"🔎 LPIPS: {best['lpips']:.3f}")
+                    self.log.info(f"🔎 LPIPS: {best['lpips']:.3f}")
             else:
-                # Preserve original
-                shutil.copy2(pdf_path, output_name)
+                # Preserve original: hardlink it (no data I/O), copying bytes only across
+                # filesystems
+                self._link_or_copy(pdf_path, output_name, original_size)
                 result = {
                     "original_file": pdf_path.name,
                     "final_file": output_name.name,
@@ -288,27 +1691,19 @@ class PDFCompressor:
                     "winner_method": "no_change",
                     "quality_score": 100.0,
                 }
-                print("\n🛡️  No change (preserving original)")
-
-            # cleanup temps
-            for method, temp in candidates:
-                try:
-                    if temp.exists():
-                        temp.unlink()
-                except Exception:
-                    pass
+                self.log.info("\n🛡️  No change (preserving original)")
 
             # Record telemetry result if enabled
             if self.enable_telemetry and self.telemetry is not None and doc_id:
                 try:
                     self.telemetry.record_compression_result(doc_id, result)
                 except Exception as e:
-                    print(f"⚠️  Telemetry record failed: {e}")
+                    self.log.warning(f"⚠️  Telemetry record failed: {e}")
 
             return result
 
         except Exception as e:
-            print(f"❌ Error: {e}")
+            self.log.warning(f"❌ Error: {e}")
             error_result = {"original_file": pdf_path.name, "error": str(e)}
             if self.enable_telemetry and self.telemetry is not None and doc_id:
                 try:
@@ -316,158 +1711,266 @@ class PDFCompressor:
                 except Exception:
                     pass
             return error_result
+        finally:
+            # The --batch-dedupe slice was made outside the work dir, so it is removed explicitly
+            for method, temp, _ in candidates:
+                if method == "batch_dedupe":
+                    self._discard_candidate(temp)
 
     # ---------- content detection & sharpness ----------
-    def _detect_content_profile(self, pdf: Path, pages: int = 2, dpi: int = 120) -> Optional[Dict[str, Any]]:
+    def _classify_pdf(self, pdf: Path, size: int, chunk_size: int = 1024 * 1024) -> Dict[str, Any]:
+        """Bucket a PDF as text_only, image_heavy or mixed from a single raw byte scan.
+
+        Much cheaper than any Ghostscript pass; used to skip strategies that cannot help
+        (e.g. image recompression on a PDF without images). The page count is best-effort:
+        page dictionaries may be hidden in compressed object streams.
+
+        A file is flagged already_optimized when it is linearized or uses object streams
+        and every stream carries a /Filter, i.e. the lossless qpdf pass has nothing left to do;
+        fully_optimized when it is also under FULLY_OPTIMIZED_BYTES_PER_PAGE, where no pass
+        is worth running.
+        """
+        counts = dict.fromkeys(_SCAN_PATTERNS, 0)
+        tail = b""
+        linearized = False
+        with open(pdf, "rb") as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                if not tail:
+                    # The linearization dictionary must be the first object in the file
+                    linearized = b"/Linearized" in chunk[:1024]
+                # Carry a short overlap so markers split across chunks are still seen;
+                # matches lying entirely inside the overlap were counted last round
+                data = tail + chunk
+                seen = len(tail)
+                for key, pattern in _SCAN_PATTERNS.items():
+                    counts[key] += sum(1 for m in pattern.finditer(data) if m.end() > seen)
+                tail = data[-32:]
+        images, pages = counts["images"], counts["pages"]
+        if not pages and counts["object_streams"]:
+            # Page dictionaries compressed into object streams: ask the PDF's page tree instead
+            pages = self._page_count(pdf) or 0
+        already_optimized = (linearized or counts["object_streams"] > 0) and counts[
+            "filters"
+        ] >= counts["streams"]
+        if images == 0:
+            kind = "text_only"
+        elif pages and images >= pages:
+            kind = "image_heavy"
+        else:
+            kind = "mixed"
+        return {
+            "kind": kind,
+            "images": images,
+            "pages": pages or None,
+            "pre_optimized": bool(pages) and size / pages < PRE_OPTIMIZED_BYTES_PER_PAGE,
+            "already_optimized": already_optimized,
+            "fully_optimized": already_optimized
+            and bool(pages)
+            and size / pages < FULLY_OPTIMIZED_BYTES_PER_PAGE,
+        }
+
+    def _plan_for_profile(
+        self,
+        plan: List[Tuple[str, Callable[[Path], Optional[Path]]]],
+        profile: Optional[Dict[str, Any]],
+        requested: Set[str] = frozenset(),
+    ) -> List[Tuple[str, Callable[[Path], Optional[Path]]]]:
+        """Drop auto-added strategies that STRATEGIES_BY_MODE does not list for the content mode.
+
+        requested (flag-enabled) strategies and SAFER_ALTERNATIVES are always kept. With no
+        profile, or if nothing in the plan is listed for the mode, the plan is kept as is.
+        """
+        wanted = self.STRATEGIES_BY_MODE.get(profile.get("mode")) if profile else None
+        if not wanted or not any(name in wanted for name, _ in plan):
+            return plan
+        keep = set(wanted) | set(requested) | set(self.SAFER_ALTERNATIVES)
+        kept = [(name, fn) for name, fn in plan if name in keep]
+        dropped = [name for name, _ in plan if name not in keep]
+        if dropped:
+            self.log.info(f"⏭️  {profile['mode']} profile: skipping {', '.join(dropped)}")
+        return kept
+
+    def _prune_plan(
+        self,
+        plan: List[Tuple[str, Callable[[Path], Optional[Path]]]],
+        pdf_class: Dict[str, Any],
+    ) -> List[Tuple[str, Callable[[Path], Optional[Path]]]]:
+        """Drop strategies the cheap classification says cannot win (override with --force-all).
+
+        - text_only: no images to recompress, so only the lossless qpdf pass is run
+        - image_heavy: the qpdf pass cannot touch image data, skip it
+        - pre_optimized (< PRE_OPTIMIZED_BYTES_PER_PAGE per page): skip the aggressive pass
+        - already_optimized: skip the qpdf pass, which would only re-serialize the file
+        - fully_optimized: skip everything; the original is kept
+
+        Only fully_optimized empties the plan: every other plan keeps one of
+        SAFER_ALTERNATIVES for the quality gates, even when all its strategies were pruned.
+        """
+        if pdf_class["fully_optimized"]:
+            self.log.info("⏭️  Already optimized and compact: keeping the original")
+            return []
+        names = [name for name, _ in plan]
+        skip = set()
+        if pdf_class["kind"] == "text_only" and "conservative" in names:
+            skip.update(n for n in names if n != "conservative")
+        elif pdf_class["kind"] == "image_heavy" and len(names) > 1:
+            skip.add("conservative")
+        if pdf_class["already_optimized"]:
+            skip.add("conservative")
+        if pdf_class["pre_optimized"] and len(set(names) - skip) > 1:
+            skip.add("aggressive_safe")
+        kept = [n for n in names if n not in skip]
+        if not any(n in self.SAFER_ALTERNATIVES for n in kept):
+            # The quality gates need something safer to fall back to
+            skip.discard(next((n for n in self.SAFER_ALTERNATIVES if n in names), None))
+        if skip:
+            self.log.info(
+                f"⏭️  {pdf_class['kind']} content: "
+                f"skipping {', '.join(n for n in names if n in skip)}"
+            )
+        return [(name, fn) for name, fn in plan if name not in skip]
+
+    def _detect_content_profile(
+        self, pdf: Path, pages: int = 2, dpi: int = 72
+    ) -> Optional[Dict[str, Any]]:
         """Detect if document is predominantly bitonal, grayscale, or color.
 
-        Heuristic using low-DPI rasterization and simple color metrics.
+        Heuristic using low-DPI rasterization (PDFium in-process, else gs) and simple color
+        metrics (uint8 OpenCV passes when cv2 is available, Numba or float NumPy otherwise).
         """
-        if not self.tools.get("gs"):
+        rasters = self._raster_pages(pdf, pages, dpi, color=True)
+        if not rasters:
             return None
-        with tempfile.TemporaryDirectory() as tmpdir:
-            out = Path(tmpdir)
-            ok = self._rasterize_pdf_to_pngs(pdf, out, pages, dpi)
-            if not ok:
-                return None
-            try:
-                from PIL import Image  # type: ignore
-            except Exception:
-                Image = None  # type: ignore
-            try:
-                import numpy as np  # type: ignore
-            except Exception:
-                np = None  # type: ignore
+
+        def page_stats(bgr: Any) -> Tuple[float, int, int, int]:
+            """(colorfulness, dark pixels, light pixels, total pixels) of one BGR page."""
+            if HAS_CV2:
+                # uint8 SIMD passes throughout: no float copies of the page
+                b, g, r = cv2.split(bgr)
+                deviation = sum(cv2.mean(cv2.absdiff(x, y))[0] for x, y in ((r, g), (g, b), (b, r)))
+                gray = cv2.cvtColor(bgr, cv2.COLOR_BGR2GRAY)
+                low = cv2.countNonZero(cv2.inRange(gray, 0, 29))
+                high = cv2.countNonZero(cv2.inRange(gray, 226, 255))
+                return deviation / (3 * 255.0), low, high, gray.size
+            if HAS_NUMBA:
+                return _rgb_page_stats(bgr[:, :, ::-1])
+            r = bgr[:, :, 2].astype('float32')
+            g = bgr[:, :, 1].astype('float32')
+            b = bgr[:, :, 0].astype('float32')
+            colorfulness = float((abs(r - g) + abs(g - b) + abs(b - r)).mean() / (3 * 255.0))
+            gray = (0.299 * r + 0.587 * g + 0.114 * b)
+            return colorfulness, int((gray < 30).sum()), int((gray > 225).sum()), gray.size
+
+        color_count = 0
+        gray_like_count = 0
+        bitonal_like_count = 0
+        total_imgs = 0
+        for bgr in rasters:
             try:
-                import cv2  # type: ignore
+                colorfulness, low, high, total = page_stats(bgr)
             except Exception:
-                cv2 = None  # type: ignore
-
-            if np is None:
-                return None
-
-            def read_rgb(p: Path):
-                try:
-                    if 'cv2' in locals() and cv2 is not None:
-                        bgr = cv2.imread(str(p), cv2.IMREAD_COLOR)
-                        if bgr is None:
-                            return None
-                        return bgr[:, :, ::-1]  # BGR->RGB
-                    if Image is not None:
-                        return np.array(Image.open(p).convert('RGB'))
-                except Exception:
-                    return None
-                return None
+                continue
+            total_imgs += 1
+            # Colorfulness proxy: mean channel deviation normalized
+            if colorfulness < 0.02:
+                gray_like_count += 1
+            else:
+                color_count += 1
+            # Bitonal proxy: majority of pixels near extremes
+            mid = total - low - high
+            if (low + high) / total > 0.85 and mid / total < 0.15:
+                bitonal_like_count += 1
 
-            color_count = 0
-            gray_like_count = 0
-            bitonal_like_count = 0
-            total_imgs = 0
-            for img_path in sorted(out.glob('page-*.png')):
-                rgb = read_rgb(img_path)
-                if rgb is None:
-                    continue
-                total_imgs += 1
-                r = rgb[:, :, 0].astype('float32')
-                g = rgb[:, :, 1].astype('float32')
-                b = rgb[:, :, 2].astype('float32')
-                # Colorfulness proxy: mean channel deviation normalized
-                colorfulness = float((abs(r - g) + abs(g - b) + abs(b - r)).mean() / (3 * 255.0))
-                if colorfulness < 0.02:
-                    gray_like_count += 1
-                else:
-                    color_count += 1
-                # Bitonal proxy: majority of pixels near extremes
-                gray = (0.299 * r + 0.587 * g + 0.114 * b)
-                total = gray.size
-                low = (gray < 30).sum()
-                high = (gray > 225).sum()
-                mid = total - int(low) - int(high)
-                if (low + high) / total > 0.85 and mid / total < 0.15:
-                    bitonal_like_count += 1
-
-            if total_imgs == 0:
-                return None
-            mode = 'color'
-            if bitonal_like_count / total_imgs >= 0.5:
-                mode = 'bitonal'
-            elif gray_like_count / total_imgs >= 0.5:
-                mode = 'grayscale'
-            return {
-                'mode': mode,
-                'counts': {
-                    'color': color_count,
-                    'grayscale_like': gray_like_count,
-                    'bitonal_like': bitonal_like_count,
-                    'total': total_imgs,
-                }
+        if total_imgs == 0:
+            return None
+        mode = 'color'
+        if bitonal_like_count / total_imgs >= 0.5:
+            mode = 'bitonal'
+        elif gray_like_count / total_imgs >= 0.5:
+            mode = 'grayscale'
+        return {
+            'mode': mode,
+            'counts': {
+                'color': color_count,
+                'grayscale_like': gray_like_count,
+                'bitonal_like': bitonal_like_count,
+                'total': total_imgs,
             }
+        }
 
-    def _compute_sharpness_metric(self, pdf: Path, pages: int = 2, dpi: int = 150) -> Optional[float]:
-        """Compute average sharpness via Laplacian variance (or gradient variance fallback)."""
-        if not self.tools.get("gs"):
+    def _compute_sharpness_metric(
+        self, pdf: Path, pages: int = 3, dpi: int = 100
+    ) -> Optional[float]:
+        """Compute average sharpness via Laplacian variance (or gradient variance fallback).
+
+        Same pages and effective resolution as the PSNR gate, so with PDFium the gate reuses
+        these rasters (see _raster_pages) instead of rendering the original and winner again.
+        """
+        rasters = self._raster_pages(pdf, pages, dpi)
+        if not rasters:
             return None
-        with tempfile.TemporaryDirectory() as d:
-            outdir = Path(d)
-            if not self._rasterize_pdf_to_pngs(pdf, outdir, pages, dpi):
-                return None
-            try:
-                from PIL import Image  # type: ignore
-            except Exception:
-                Image = None  # type: ignore
+        # Pages of one size are filtered as a single stack; slivers/thumbnails only add noise
+        by_shape: Dict[Tuple[int, ...], List[Any]] = {}
+        for arr in rasters:
+            if min(arr.shape[:2]) >= 128:
+                by_shape.setdefault(arr.shape, []).append(arr)
+        vals: List[float] = []
+        for (h, w), group in by_shape.items():
             try:
-                import numpy as np  # type: ignore
-            except Exception:
-                np = None  # type: ignore
-            try:
-                import cv2  # type: ignore
+                if HAS_CV2:
+                    # Each page gets a 1-row reflected border so the kernel never reads across a
+                    # page seam; slicing the borders off leaves exactly the per-page Laplacian
+                    padded = np.concatenate(
+                        [cv2.copyMakeBorder(a, 1, 1, 0, 0, cv2.BORDER_REFLECT_101) for a in group]
+                    )
+                    # The 3x3 Laplacian of uint8 data fits int16 exactly (|value| <= 1020);
+                    # meanStdDev then reduces each page in one pass, with no float temporaries
+                    lap = cv2.Laplacian(padded, cv2.CV_16S).reshape(len(group), h + 2, w)[:, 1:-1]
+                    vals.extend(float(cv2.meanStdDev(page)[1][0, 0]) ** 2 for page in lap)
+                else:
+                    # Fallback: gradient magnitude variance
+                    stack = np.stack(group).astype('float32')
+                    gx = np.diff(stack, axis=2)
+                    gy = np.diff(stack, axis=1)
+                    mag = np.sqrt(gx[:, :-1, :] ** 2 + gy[:, :, :-1] ** 2)
+                    vals.extend(mag.var(axis=(1, 2)).tolist())
             except Exception:
-                cv2 = None  # type: ignore
-            if np is None:
-                return None
-            vals: List[float] = []
-            for p in sorted(outdir.glob('page-*.png')):
-                # grayscale array
-                arr = self._read_image_to_array(p, Image, np, cv2)
-                if arr is None:
-                    continue
-                try:
-                    if cv2 is not None:
-                        lap = cv2.Laplacian(arr, cv2.CV_32F)
-                        vals.append(float(lap.var()))
-                    else:
-                        # Fallback: gradient magnitude variance
-                        gx = np.diff(arr.astype('float32'), axis=1)
-                        gy = np.diff(arr.astype('float32'), axis=0)
-                        mag = np.sqrt(gx[:, :-1] ** 2 + gy[:-1, :] ** 2)
-                        vals.append(float(mag.var()))
-                except Exception:
-                    continue
-            if not vals:
-                return None
-            return float(sum(vals) / len(vals))
+                continue
+        if not vals:
+            return None
+        return float(sum(vals) / len(vals))
 
     # ---------- strategies ----------
     def _conservative_qpdf(self, pdf: Path) -> Optional[Path]:
-        print("🛡️  Conservative compression (qpdf)…")
-        if not self.tools.get("qpdf"):
+        self.log.info("🛡️  Conservative compression (qpdf)…")
+        if not self.tools.get("qpdf") and not HAS_PIKEPDF:
             return None
-        tmp = Path(tempfile.mktemp(suffix="_conservative.pdf"))
-        cmd = [
-            self.tools["qpdf"],
-            "--optimize-images",
-            "--compress-streams=y",
-            "--object-streams=generate",
-            str(pdf),
-            str(tmp),
-        ]
+        tmp = self._temp_path("_conservative.pdf")
+        if HAS_PIKEPDF:
+            # Same QPDFJob as the CLI, without fork/exec and argv re-parsing
+            try:
+                args = [*self._qpdf_stream_args(self._libqpdf_version()), str(pdf), str(tmp)]
+                job = pikepdf.Job(["qpdf", *args])
+                job.run()
+                if job.exit_code == 0 and self._produced(tmp):
+                    return tmp
+            except Exception as e:
+                self.log.warning(f"  ⚠️  pikepdf job failed, retrying with the qpdf CLI: {e}")
+            if not self.tools.get("qpdf"):
+                self._discard_candidate(tmp)
+                return None
+        version = self._probe_qpdf_version(self.tools["qpdf"])
+        cmd = [self.tools["qpdf"], *self._qpdf_stream_args(version), str(pdf), str(tmp)]
         try:
-            r = subprocess.run(cmd, capture_output=True, text=True, timeout=300)
-            if r.returncode == 0 and tmp.exists():
-                print(f"  ✅ conservative: {tmp.stat().st_size / (1024*1024):.2f} MB")
+            r = _run_silent(cmd, timeout=300)
+            if r.returncode == 0 and self._produced(tmp):
                 return tmp
         except Exception as e:
-            print(f"  ❌ conservative error: {e}")
+            self.log.warning(f"  ❌ conservative error: {e}")
+        self._discard_candidate(tmp)
         return None
 
     def _text_preserve_gs(self, pdf: Path) -> Optional[Path]:
@@ -478,50 +1981,16 @@ class PDFCompressor:
         - Moderate JPEG quality for color images
         - Keep higher resolution for mono/gray to avoid stair-stepping
         """
-        print("🧼 Text-preserve Ghostscript…")
+        self.log.info("🧼 Text-preserve Ghostscript…")
         if not self.tools.get("gs"):
             return None
-        tmp = Path(tempfile.mktemp(suffix="_textpreserve.pdf"))
-        cmd = [
-            self.tools["gs"],
-            "-sDEVICE=pdfwrite",
-            "-dCompatibilityLevel=1.6",
-            "-dNOPAUSE",
-            "-dQUIET",
-            "-dBATCH",
-            # Avoid auto filters that may pick noisy JPEG for gray
-            "-dAutoFilterGrayImages=false",
-            "-dGrayImageFilter=/FlateEncode",
-            # Prefer CCITT for mono (bitonal) content
-            "-dAutoFilterMonoImages=false",
-            "-dMonoImageFilter=/CCITTFaxEncode",
-            "-dMonoImageDownsampleType=/Subsample",
-            "-dMonoImageResolution=600",
-            # Color images with moderate JPEG quality
-            "-dAutoFilterColorImages=false",
-            "-dColorImageFilter=/DCTEncode",
-            "-dJPEGQ=85",
-            "-dColorImageDownsampleType=/Bicubic",
-            "-dColorImageResolution=200",
-            # Gray images kept higher res, helps text scans
-            "-dGrayImageDownsampleType=/Bicubic",
-            "-dGrayImageResolution=300",
-            # Preserve annotations and fonts
-            "-dEmbedAllFonts=true",
-            "-dSubsetFonts=true",
-            "-dCompressFonts=false",
-            "-dPreserveAnnots=true",
-            "-dDetectDuplicateImages=true",
-            f"-sOutputFile={tmp}",
-            str(pdf),
-        ]
+        tmp = self._temp_path("_textpreserve.pdf")
         try:
-            r = subprocess.run(cmd, capture_output=True, text=True, timeout=300)
-            if r.returncode == 0 and tmp.exists():
-                print(f"  ✅ text_preserve: {tmp.stat().st_size / (1024*1024):.2f} MB")
+            if self._run_pdfwrite("text_preserve", _TEXT_PRESERVE_GS_ARGS, pdf, tmp):
                 return tmp
         except Exception as e:
-            print(f"  ❌ text_preserve error: {e}")
+            self.log.warning(f"  ❌ text_preserve error: {e}")
+        self._discard_candidate(tmp)
         return None
 
     def _grayscale_pref_gs(self, pdf: Path) -> Optional[Path]:
@@ -529,45 +1998,16 @@ class PDFCompressor:
 
         Uses JPEG (DCTEncode) with high quality for grayscale to prevent huge size increase.
         """
-        print("🧼 Grayscale-preferred Ghostscript…")
+        self.log.info("🧼 Grayscale-preferred Ghostscript…")
         if not self.tools.get("gs"):
             return None
-        tmp = Path(tempfile.mktemp(suffix="_grayscale.pdf"))
-        cmd = [
-            self.tools["gs"],
-            "-sDEVICE=pdfwrite",
-            "-dCompatibilityLevel=1.6",
-            "-dNOPAUSE",
-            "-dQUIET",
-            "-dBATCH",
-            # Suggest grayscale conversion for output
-            "-sColorConversionStrategy=Gray",
-            "-dProcessColorModel=/DeviceGray",
-            # Filters
-            "-dAutoFilterGrayImages=false",
-            "-dGrayImageFilter=/DCTEncode",
-            "-dJPEGQ=90",
-            "-dGrayImageDownsampleType=/Bicubic",
-            "-dGrayImageResolution=300",
-            # Keep mono CCITT
-            "-dAutoFilterMonoImages=false",
-            "-dMonoImageFilter=/CCITTFaxEncode",
-            "-dMonoImageResolution=600",
-            # Preserve fonts/annots
-            "-dEmbedAllFonts=true",
-            "-dSubsetFonts=true",
-            "-dCompressFonts=false",
-            "-dPreserveAnnots=true",
-            f"-sOutputFile={tmp}",
-            str(pdf),
-        ]
+        tmp = self._temp_path("_grayscale.pdf")
         try:
-            r = subprocess.run(cmd, capture_output=True, text=True, timeout=300)
-            if r.returncode == 0 and tmp.exists():
-                print(f"  ✅ grayscale_pref: {tmp.stat().st_size / (1024*1024):.2f} MB")
+            if self._run_pdfwrite("grayscale_pref", _GRAYSCALE_PREF_GS_ARGS, pdf, tmp):
                 return tmp
         except Exception as e:
-            print(f"  ❌ grayscale_pref error: {e}")
+            self.log.warning(f"  ❌ grayscale_pref error: {e}")
+        self._discard_candidate(tmp)
         return None
 
     def _color_text_safe_gs(self, pdf: Path) -> Optional[Path]:
@@ -577,47 +2017,16 @@ class PDFCompressor:
         - Use high JPEG quality to reduce chroma artifacts
         - Keep gray/mono settings from text-preserve where safe
         """
-        print("🧼 Color-text-safe Ghostscript…")
+        self.log.info("🧼 Color-text-safe Ghostscript…")
         if not self.tools.get("gs"):
             return None
-        tmp = Path(tempfile.mktemp(suffix="_color_text_safe.pdf"))
-        cmd = [
-            self.tools["gs"],
-            "-sDEVICE=pdfwrite",
-            "-dCompatibilityLevel=1.6",
-            "-dNOPAUSE",
-            "-dQUIET",
-            "-dBATCH",
-            # Color images: no downsample, high quality JPEG
-            "-dDownsampleColorImages=false",
-            "-dAutoFilterColorImages=false",
-            "-dColorImageFilter=/DCTEncode",
-            "-dJPEGQ=95",
-            # Gray images: lossless to keep text edges
-            "-dAutoFilterGrayImages=false",
-            "-dGrayImageFilter=/FlateEncode",
-            "-dGrayImageDownsampleType=/Bicubic",
-            "-dGrayImageResolution=300",
-            # Mono: CCITT
-            "-dAutoFilterMonoImages=false",
-            "-dMonoImageFilter=/CCITTFaxEncode",
-            "-dMonoImageResolution=600",
-            # Preserve fonts/annots
-            "-dEmbedAllFonts=true",
-            "-dSubsetFonts=true",
-            "-dCompressFonts=false",
-            "-dPreserveAnnots=true",
-            "-dDetectDuplicateImages=true",
-            f"-sOutputFile={tmp}",
-            str(pdf),
-        ]
+        tmp = self._temp_path("_color_text_safe.pdf")
         try:
-            r = subprocess.run(cmd, capture_output=True, text=True, timeout=300)
-            if r.returncode == 0 and tmp.exists():
-                print(f"  ✅ color_text_safe: {tmp.stat().st_size / (1024*1024):.2f} MB")
+            if self._run_pdfwrite("color_text_safe", _COLOR_TEXT_SAFE_GS_ARGS, pdf, tmp):
                 return tmp
         except Exception as e:
-            print(f"  ❌ color_text_safe error: {e}")
+            self.log.warning(f"  ❌ color_text_safe error: {e}")
+        self._discard_candidate(tmp)
         return None
 
     def _bitonal_ccitt_raster(self, pdf: Path, dpi: int = 300) -> Optional[Path]:
@@ -625,158 +2034,231 @@ class PDFCompressor:
 
         Heavy-handed but effective for receipts/bitonal scans suffering from noise.
         """
-        print("🧼 Bitonal CCITT raster…")
+        self.log.info("🧼 Bitonal CCITT raster…")
         if not self.tools.get("gs"):
             return None
-        with tempfile.TemporaryDirectory() as td:
+        with tempfile.TemporaryDirectory(dir=self._scratch_dir()) as td:
             tdir = Path(td)
-            tiff_pattern = str(tdir / "page-%03d.tif")
-            # Step 1: PDF -> TIFF G4 (1-bit)
-            cmd1 = [
-                self.tools["gs"],
-                "-sDEVICE=tiffg4",
-                f"-r{dpi}",
-                "-dNOPAUSE",
-                "-dBATCH",
-                "-dQUIET",
-                f"-sOutputFile={tiff_pattern}",
-                str(pdf),
-            ]
+
+            # Step 1: PDF -> TIFF G4 (1-bit); long documents are split into page ranges
+            # rendered by concurrent gs processes (file names sort back into page order)
+            def render(first: Optional[int], last: Optional[int]) -> bool:
+                cmd1 = [
+                    self.tools["gs"],
+                    "-sDEVICE=tiffg4",
+                    f"-r{dpi}",
+                    "-dNOPAUSE",
+                    "-dBATCH",
+                    "-dQUIET",
+                    "-dNumRenderingThreads=2",
+                ]
+                if first is not None:
+                    cmd1 += [f"-dFirstPage={first}", f"-dLastPage={last}"]
+                cmd1 += [f"-sOutputFile={tdir / f'page-{first or 1:05d}-%05d.tif'}", str(pdf)]
+                return _run_silent(cmd1, timeout=420).returncode == 0
+
+            ranges = self._page_ranges(self._page_count(pdf))
             try:
-                r1 = subprocess.run(cmd1, capture_output=True, text=True, timeout=420)
-                if r1.returncode != 0 or not list(tdir.glob('page-*.tif')):
+                with ThreadPoolExecutor(max_workers=len(ranges)) as pool:
+                    ok = all(pool.map(lambda r: render(*r), ranges))
+                if not ok or not list(tdir.glob('page-*.tif')):
                     return None
             except Exception:
                 return None
 
             # Step 2: TIFFs -> PDF
-            out_pdf = Path(tempfile.mktemp(suffix="_bitonal.pdf"))
-            # Use Ghostscript to assemble images into PDF
+            out_pdf = self._temp_path("_bitonal.pdf")
             # Note: order sorted to maintain page order
             tiffs = sorted(tdir.glob('page-*.tif'))
-            # Ghostscript accepts multiple inputs; we can pass them in order
-            cmd2 = [self.tools["gs"], "-sDEVICE=pdfwrite", "-dNOPAUSE", "-dBATCH", "-dQUIET",
-                    f"-sOutputFile={out_pdf}"] + [str(p) for p in tiffs]
             try:
-                r2 = subprocess.run(cmd2, capture_output=True, text=True, timeout=420)
-                if r2.returncode == 0 and out_pdf.exists():
-                    print(f"  ✅ bitonal_ccitt: {out_pdf.stat().st_size / (1024*1024):.2f} MB")
+                if HAS_IMG2PDF:
+                    # G4 strips are copied into the PDF as CCITTFax streams: no decode/re-encode
+                    with open(out_pdf, "wb") as f:
+                        img2pdf.convert([str(p) for p in tiffs], outputstream=f)
+                    ok = True
+                else:
+                    # Ghostscript accepts multiple inputs; we can pass them in order
+                    cmd2 = [
+                        self.tools["gs"],
+                        "-sDEVICE=pdfwrite",
+                        "-dNOPAUSE",
+                        "-dBATCH",
+                        "-dQUIET",
+                        f"-sOutputFile={out_pdf}",
+                    ] + [str(p) for p in tiffs]
+                    ok = _run_silent(cmd2, timeout=420).returncode == 0
+                if ok and self._produced(out_pdf):
                     return out_pdf
             except Exception as e:
-                print(f"  ❌ bitonal_ccitt error: {e}")
+                self.log.warning(f"  ❌ bitonal_ccitt error: {e}")
+            self._discard_candidate(out_pdf)
             return None
 
+    def _page_ranges(
+        self, pages: Optional[int], min_pages: int = 8
+    ) -> List[Tuple[Optional[int], Optional[int]]]:
+        """Split 1..pages into up to one range per strategy slot, each at least min_pages long.
+
+        Short or uncounted documents get a single unbounded range: a gs start-up per
+        range only pays off when each range has real work.
+        """
+        chunks = min(self._strategy_slots, (pages or 0) // min_pages)
+        if chunks < 2:
+            return [(None, None)]
+        size = -(-pages // chunks)
+        return [(first, min(first + size - 1, pages)) for first in range(1, pages + 1, size)]
+
+    def _page_count(self, pdf: Path) -> Optional[int]:
+        """Page count via pikepdf or PDFium; None if neither is available or the file won't open."""
+        try:
+            if HAS_PIKEPDF:
+                with pikepdf.open(pdf) as doc:
+                    return len(doc.pages)
+            if HAS_PDFIUM:
+                with _PDFIUM_LOCK:
+                    doc = pdfium.PdfDocument(str(pdf))
+                    try:
+                        return len(doc)
+                    finally:
+                        doc.close()
+        except Exception:
+            pass
+        return None
+
     def _high_quality_gs(self, pdf: Path) -> Optional[Path]:
-        print("💎 High-quality Ghostscript…")
+        self.log.info("💎 High-quality Ghostscript…")
         if not self.tools.get("gs"):
             return None
-        tmp = Path(tempfile.mktemp(suffix="_hq.pdf"))
-        cmd = [
-            self.tools["gs"],
-            "-sDEVICE=pdfwrite",
-            "-dCompatibilityLevel=1.7",
-            "-dPDFSETTINGS=/prepress",
-            "-dNOPAUSE",
-            "-dQUIET",
-            "-dBATCH",
-            "-dColorImageResolution=300",
-            "-dGrayImageResolution=300",
-            "-dMonoImageResolution=1200",
-            "-dColorImageDownsampleThreshold=2.0",
-            "-dGrayImageDownsampleThreshold=2.0",
-            "-dMonoImageDownsampleThreshold=2.0",
-            "-dOptimize=true",
-            "-dEmbedAllFonts=true",
-            "-dSubsetFonts=true",
-            "-dCompressFonts=false",
-            "-dPreserveAnnots=true",
-            f"-sOutputFile={tmp}",
-            str(pdf),
-        ]
+        tmp = self._temp_path("_hq.pdf")
         try:
-            r = subprocess.run(cmd, capture_output=True, text=True, timeout=300)
-            if r.returncode == 0 and tmp.exists():
-                print(f"  ✅ high_quality: {tmp.stat().st_size / (1024*1024):.2f} MB")
+            if self._run_pdfwrite("high_quality", _HQ_GS_ARGS, pdf, tmp):
                 return tmp
         except Exception as e:
-            print(f"  ❌ high_quality error: {e}")
+            self.log.warning(f"  ❌ high_quality error: {e}")
+        self._discard_candidate(tmp)
         return None
 
     def _balanced_gs(self, pdf: Path) -> Optional[Path]:
-        print("⚖️  Balanced Ghostscript…")
+        self.log.info("⚖️  Balanced Ghostscript…")
         if not self.tools.get("gs"):
             return None
-        tmp = Path(tempfile.mktemp(suffix="_balanced.pdf"))
-        cmd = [
-            self.tools["gs"],
-            "-sDEVICE=pdfwrite",
-            "-dCompatibilityLevel=1.6",
-            "-dPDFSETTINGS=/printer",
-            "-dNOPAUSE",
-            "-dQUIET",
-            "-dBATCH",
-            "-dColorImageResolution=200",
-            "-dGrayImageResolution=200",
-            "-dMonoImageResolution=600",
-            "-dColorImageDownsampleThreshold=1.5",
-            "-dOptimize=true",
-            "-dEmbedAllFonts=true",
-            "-dSubsetFonts=true",
-            f"-sOutputFile={tmp}",
-            str(pdf),
-        ]
+        tmp = self._temp_path("_balanced.pdf")
         try:
-            r = subprocess.run(cmd, capture_output=True, text=True, timeout=300)
-            if r.returncode == 0 and tmp.exists():
-                print(f"  ✅ balanced: {tmp.stat().st_size / (1024*1024):.2f} MB")
+            if self._run_pdfwrite("balanced", _BALANCED_GS_ARGS, pdf, tmp):
+                if self._gs_legacy_pdf_switch:
+                    tmp = self._smaller_with_new_interpreter(
+                        "balanced", _BALANCED_GS_ARGS, pdf, tmp
+                    )
                 return tmp
         except Exception as e:
-            print(f"  ❌ balanced error: {e}")
+            self.log.warning(f"  ❌ balanced error: {e}")
+        self._discard_candidate(tmp)
         return None
 
+    def _smaller_with_new_interpreter(
+        self, variant: str, args: Sequence[str], pdf: Path, legacy_out: Path
+    ) -> Path:
+        """Re-run a pass on the new PDF interpreter and keep whichever output is smaller."""
+        alt = self._temp_path(f"_{variant}_newpdf.pdf")
+        try:
+            if self._run_pdfwrite(variant, args, pdf, alt, new_interpreter=True):
+                if alt.stat().st_size < legacy_out.stat().st_size:
+                    self._discard_candidate(legacy_out)
+                    return alt
+        except Exception:
+            pass
+        self._discard_candidate(alt)
+        return legacy_out
+
     def _aggressive_safe_gs(self, pdf: Path) -> Optional[Path]:
-        print("🎯 Aggressive-safe Ghostscript…")
+        self.log.info("🎯 Aggressive-safe Ghostscript…")
         if not self.tools.get("gs"):
             return None
-        tmp = Path(tempfile.mktemp(suffix="_aggressive.pdf"))
-        cmd = [
-            self.tools["gs"],
-            "-sDEVICE=pdfwrite",
-            "-dCompatibilityLevel=1.5",
-            "-dPDFSETTINGS=/ebook",
-            "-dNOPAUSE",
-            "-dQUIET",
-            "-dBATCH",
-            "-dColorImageResolution=150",
-            "-dGrayImageResolution=150",
-            "-dMonoImageResolution=600",
-            "-dColorImageDownsampleThreshold=1.2",
-            "-dOptimize=true",
-            "-dEmbedAllFonts=true",
-            "-dSubsetFonts=true",
-            "-dDetectDuplicateImages=true",
-            f"-sOutputFile={tmp}",
-            str(pdf),
-        ]
+        tmp = self._temp_path("_aggressive.pdf")
         try:
-            r = subprocess.run(cmd, capture_output=True, text=True, timeout=300)
-            if r.returncode == 0 and tmp.exists():
-                print(f"  ✅ aggressive_safe: {tmp.stat().st_size / (1024*1024):.2f} MB")
+            if self._run_pdfwrite("aggressive_safe", _AGGRESSIVE_GS_ARGS, pdf, tmp):
                 return tmp
         except Exception as e:
-            print(f"  ❌ aggressive_safe error: {e}")
+            self.log.warning(f"  ❌ aggressive_safe error: {e}")
+        self._discard_candidate(tmp)
         return None
 
+    def _batch_dedupe_gs(self, pdfs: List[Path]) -> Dict[Path, Path]:
+        """Run one aggressive-safe pass over the whole batch so shared images/fonts are
+        processed once.
+
+        Inputs are merged in-process with pikepdf, rewritten by a single Ghostscript call with
+        -dDetectDuplicateImages, then split back into one candidate per input file.
+        """
+        if not (HAS_PIKEPDF and self.tools.get("gs")) or len(pdfs) < 2:
+            return {}
+        self.log.info(f"🧩 Batch dedupe: merging {len(pdfs)} PDF(s) into one Ghostscript pass…")
+        merged_path = self._temp_path("_batch_merged.pdf")
+        rewritten = self._temp_path("_batch_gs.pdf")
+        ranges: Dict[Path, Tuple[int, int]] = {}
+        parts: Dict[Path, Path] = {}
+        sources: List[Any] = []
+        try:
+            with pikepdf.new() as merged:
+                for pdf in pdfs:
+                    try:
+                        src = pikepdf.open(pdf)
+                    except Exception as e:
+                        self.log.warning(f"  ⏭️  {pdf.name} left out of the batch: {e}")
+                        continue
+                    sources.append(src)
+                    ranges[pdf] = (len(merged.pages), len(src.pages))
+                    merged.pages.extend(src.pages)
+                merged.save(merged_path)
+            if len(ranges) < 2:
+                return {}
+
+            if not self._run_pdfwrite(
+                "batch_dedupe",
+                _AGGRESSIVE_GS_ARGS,
+                merged_path,
+                rewritten,
+                timeout=300 * len(ranges),
+            ):
+                self.log.warning("  ❌ batch_dedupe: Ghostscript failed, continuing per file")
+                return {}
+
+            with pikepdf.open(rewritten) as out:
+                expected = sum(count for _, count in ranges.values())
+                if len(out.pages) != expected:
+                    self.log.warning(
+                        f"  ❌ batch_dedupe: page count changed ({expected} → {len(out.pages)})"
+                    )
+                    return {}
+                for pdf, (start, count) in ranges.items():
+                    part = self._temp_path("_batch.pdf")
+                    with pikepdf.new() as doc:
+                        doc.pages.extend(out.pages[start:start + count])
+                        doc.save(part)
+                    parts[pdf] = part
+            self.log.info(f"  ✅ batch_dedupe: {len(parts)} candidate(s) ready")
+            return parts
+        except Exception as e:
+            self.log.warning(f"  ❌ batch_dedupe error: {e}")
+            for part in parts.values():
+                self._discard_candidate(part)
+            return {}
+        finally:
+            for src in sources:
+                src.close()
+            self._discard_candidate(merged_path)
+            self._discard_candidate(rewritten)
+
     def _mrc_ocrmypdf(self, pdf: Path) -> Optional[Path]:
         """MRC/OCR pipeline via OCRmyPDF with JBIG2 and image optimization.
 
         Targets scanned/image PDFs; skips OCR on pages with existing text.
         Requires ocrmypdf installed.
         """
-        print("🧠 MRC/OCR via OCRmyPDF…")
+        self.log.info("🧠 MRC/OCR via OCRmyPDF…")
         if not self.tools.get("ocrmypdf"):
             return None
-        tmp = Path(tempfile.mktemp(suffix="_mrc.pdf"))
+        tmp = self._temp_path("_mrc.pdf")
         cmd = [
             self.tools["ocrmypdf"],
             "--optimize", "3",
@@ -789,97 +2271,161 @@ class PDFCompressor:
             str(tmp),
         ]
         try:
-            r = subprocess.run(cmd, capture_output=True, text=True, timeout=900)
-            if r.returncode == 0 and tmp.exists():
-                print(f"  ✅ mrc_ocr: {tmp.stat().st_size / (1024*1024):.2f} MB")
+            r = _run_silent(cmd, timeout=900, keep_stderr=True)
+            if r.returncode == 0 and self._produced(tmp):
                 return tmp
             else:
-                if r.stderr:
-                    print(f"  ❌ mrc_ocr error: {r.stderr.splitlines()[-1]}")
+                err = r.stderr.decode(errors="replace").strip()
+                if err:
+                    self.log.warning(f"  ❌ mrc_ocr error: {err.splitlines()[-1]}")
         except Exception as e:
-            print(f"  ❌ mrc_ocr error: {e}")
+            self.log.warning(f"  ❌ mrc_ocr error: {e}")
+        self._discard_candidate(tmp)
         return None
 
     # ---------- selection ----------
-    def _select_best_result(self, original: Path, candidates: List[Tuple[str, Path]]) -> Optional[Dict]:
+    def _select_best_result(
+        self, original: Path, candidates: List[Tuple[str, Path, int]], original_size: int
+    ) -> Optional[Dict]:
         if not candidates:
             return None
-        original_size = original.stat().st_size
-        best: Optional[Dict] = None
-        best_score = -1.0
 
-        print("\n🔍 Evaluating results:")
-        # Precompute original sharpness to normalize penalties
-        try:
-            base_sharp = self._compute_sharpness_metric(original) or None
-        except Exception:
-            base_sharp = None
+        self.log.info("\n🔍 Evaluating results:")
 
-        for method, f in candidates:
-            if not f.exists():
-                continue
-            size = f.stat().st_size
-            reduction = ((original_size - size) / original_size) * 100 if original_size > 0 else 0.0
-
-            # heuristic scoring (favor moderate reductions; avoid over-aggressive)
-            if reduction < 5:
-                score = 70 + reduction
-            elif 5 <= reduction <= 50:
-                score = 80 + (reduction - 5) / 45 * 20
-            elif 50 < reduction <= 80:
-                score = 95 - (reduction - 50) / 30 * 15
+        # Score all sizes at once (bigger-than-original scores 0)
+        sized = list(candidates)
+        sizes = np.array([size for _, _, size in sized], dtype=float)
+        reductions = (
+            (original_size - sizes) / original_size * 100
+            if original_size > 0
+            else np.zeros(len(sized))
+        )
+        bonuses = np.array([self.METHOD_BONUS.get(method, 0.0) for method, _, _ in sized])
+        scores = np.interp(reductions, self.REDUCTION_SCORE_XP, self.REDUCTION_SCORE_FP) + bonuses
+        scores[reductions < 0] = 0.0
+
+        # Content-aware boost: prefer anti-noise methods for grayscale/bitonal
+        prof = getattr(self, '_content_profile', None)
+        if prof and prof.get('mode') in ('grayscale', 'bitonal'):
+            methods = np.array([method for method, _, _ in sized])
+            scores += np.where(np.isin(methods, self.ANTI_NOISE_METHODS), 6.0, 0.0)
+
+        # Sharpness penalty (up to -20 points): penalize blurred outputs vs the original.
+        # Only candidates within 20 points of the leader can be reordered by it; a lone leader
+        # that stays above the -1 cutoff needs no rasters at all
+        contenders = np.flatnonzero(scores >= scores.max() - 20.0)
+        if len(contenders) > 1 or scores.max() - 20.0 <= -1.0:
+            def sharpness(f: Path) -> float:
+                try:
+                    return self._compute_sharpness_metric(f) or np.nan
+                except Exception:
+                    return np.nan
+
+            base_sharp = sharpness(original)
+            if not np.isnan(base_sharp):
+                # Branch and bound, best size score first: a penalty only lowers a score, so once
+                # a candidate's unpenalized score is below the best penalized one, no later can win
+                best_penalized = -np.inf
+                for i in np.argsort(-scores, kind="stable"):
+                    if scores[i] < best_penalized:
+                        break
+                    cand_sharp = sharpness(sized[i][1])
+                    if not np.isnan(cand_sharp):
+                        drop_ratio = max(0.0, (base_sharp - cand_sharp) / (base_sharp + 1e-6))
+                        scores[i] -= min(20.0, drop_ratio * 40.0)
+                    best_penalized = max(best_penalized, scores[i])
+
+        for (method, _, size), reduction, score in zip(sized, reductions.tolist(), scores.tolist()):
+            self.log.info(
+                f"  📄 {method}: {size/(1024*1024):.2f} MB ({reduction:+.1f}%) "
+                f"- score: {score:.1f}"
+            )
+
+        # argmax keeps the first of equal scores, i.e. plan order breaks ties
+        winner = int(np.argmax(scores))
+        best: Optional[Dict] = None
+        if scores[winner] > -1.0:
+            method, f, size = sized[winner]
+            best = {
+                "method": method,
+                "file": f,
+                "size": size,
+                "score": float(scores[winner]),
+                "reduction": float(reductions[winner]),
+            }
+        kept: List[Tuple[str, Path, int]] = []
+        for i, (method, f, size) in enumerate(sized):
+            if (best is None or i != winner) and method not in self.SAFER_ALTERNATIVES:
+                # Worse than the winner: free its temp space right away
+                self._discard_candidate(f)
             else:
-                score = 60 - (reduction - 80)
+                kept.append((method, f, size))
 
-            if method == "conservative":
-                score += 10
-            elif method == "high_quality":
-                score += 8
-            elif method == "balanced":
-                score += 5
+        # Later stages only see what is still on disk
+        candidates[:] = kept
+        return best
 
-            if reduction < 0:
-                score = 0
+    @staticmethod
+    def _finalize_output(src: Path, dst: Path) -> None:
+        """Atomically rename src onto dst; fall back to a move across filesystems."""
+        try:
+            os.replace(src, dst)
+        except OSError:
+            shutil.move(str(src), str(dst))
 
-            # Sharpness penalty: penalize blurred outputs vs original
-            try:
-                cand_sharp = self._compute_sharpness_metric(f) or None
-            except Exception:
-                cand_sharp = None
-            if base_sharp is not None and cand_sharp is not None:
-                # If candidate sharpness drops significantly vs original, penalize
-                # Normalize penalty magnitude
-                drop_ratio = max(0.0, float(base_sharp - cand_sharp) / (base_sharp + 1e-6))
-                penalty = min(20.0, drop_ratio * 40.0)  # up to -20 points
-                if penalty > 0:
-                    score -= penalty
-
-            # Content-aware boost: prefer anti-noise methods for grayscale/bitonal
-            prof = getattr(self, '_content_profile', None)
-            if prof and prof.get('mode') in ('grayscale', 'bitonal'):
-                if method in ("text_preserve", "grayscale_pref", "conservative", "bitonal_ccitt"):
-                    score += 6
+    @classmethod
+    def _link_or_copy(cls, src: Path, dst: Path, size: int) -> None:
+        """Hardlink src to dst, replacing dst.
 
-            print(f"  📄 {method}: {size/(1024*1024):.2f} MB ({reduction:+.1f}%) - score: {score:.1f}")
-            if score > best_score:
-                best_score = score
-                best = {"method": method, "file": f, "score": score, "reduction": reduction}
+        Falls back to a copy (EXDEV, EPERM, no link support).
+        """
+        try:
+            dst.unlink(missing_ok=True)
+            os.link(src, dst)
+        except OSError:
+            cls._copy_bytes(src, dst, size)
+
+    @staticmethod
+    def _copy_bytes(src: Path, dst: Path, size: int) -> None:
+        """Copy file contents without metadata, in-kernel via sendfile on Linux."""
+        # macOS/BSD sendfile only writes to sockets
+        if not sys.platform.startswith("linux"):
+            shutil.copyfile(src, dst)
+            return
+        with open(src, "rb") as s, open(dst, "wb") as d:
+            offset = 0
+            while offset < size:
+                sent = os.sendfile(d.fileno(), s.fileno(), offset, size - offset)
+                if sent == 0:
+                    break
+                offset += sent
 
-        return best
+    def _discard_candidate(self, path: Path) -> None:
+        cache = getattr(self._local, "raster_cache", None)
+        if cache is not None:
+            cache.discard(str(path))
+        try:
+            path.unlink(missing_ok=True)
+        except OSError:
+            pass
 
     # ---------- perceptual quality gates ----------
     def _apply_advanced_quality_gates(
         self,
         original: Path,
-        candidates: List[Tuple[str, Path]],
+        candidates: List[Tuple[str, Path, int]],
         best: Optional[Dict],
     ) -> Optional[Dict]:
         """Apply advanced quality gates (PSNR + SSIM + LPIPS)."""
         if not best or not self.quality_checker:
             return best
+        if self._skip_gate(best):
+            return best
 
         try:
-            passed, metrics = self.quality_checker.evaluate_quality(original, best["file"])
+            passed, metrics = self.quality_checker.evaluate_quality(
+                original, best["file"], self._gate_renderer()
+            )
             
             # Add metrics to result
             if metrics.psnr is not None:
@@ -889,78 +2435,105 @@ class PDFCompressor:
             if metrics.lpips is not None:
                 best["lpips"] = metrics.lpips
 
-            print(f"\n🔬 Advanced Quality Gates:")
+            self.log.info(f"\n🔬 Advanced Quality Gates:")
             if metrics.psnr is not None:
                 status = "✅" if metrics.psnr_passed else "❌"
-                print(f"   PSNR: {metrics.psnr:.2f} dB {status}")
+                self.log.info(f"   PSNR: {metrics.psnr:.2f} dB {status}")
             if metrics.ssim is not None:
                 status = "✅" if metrics.ssim_passed else "❌"
-                print(f"   SSIM: {metrics.ssim:.3f} {status}")
+                self.log.info(f"   SSIM: {metrics.ssim:.3f} {status}")
             if metrics.lpips is not None:
                 status = "✅" if metrics.lpips_passed else "❌"
-                print(f"   LPIPS: {metrics.lpips:.3f} {status}")
+                self.log.info(f"   LPIPS: {metrics.lpips:.3f} {status}")
             
-            print(f"   Overall: {'✅ PASS' if passed else '❌ FAIL'}")
+            self.log.info(f"   Overall: {'✅ PASS' if passed else '❌ FAIL'}")
 
             if passed:
                 best["score"] = max(best.get("score", 0.0), 95.0)
                 return best
             else:
-                print("⚠️  Failed quality gates, trying safer alternatives…")
+                self.log.warning("⚠️  Failed quality gates, trying safer alternatives…")
                 return self._try_safer_alternatives(original, candidates, metrics)
 
         except Exception as e:
-            print(f"⚠️  Quality gate evaluation failed: {e}")
+            self.log.warning(f"⚠️  Quality gate evaluation failed: {e}")
             # Fall back to PSNR-only
             return self._apply_psnr_quality_gate(original, candidates, best)
 
+    def _gate_renderer(self) -> Optional[Callable[[Path, int], List[Any]]]:
+        """The gates' renderer bound to this file's raster cache (their pool threads lack it)."""
+        return self._in_worker(self._render_pages_rgb) if HAS_PDFIUM else None
+
+    def _skip_gate(self, best: Dict) -> bool:
+        """Modest reductions can't carry visible damage: trust the size heuristic
+        (unless --always-gate)."""
+        if self.always_gate or best.get("reduction", 0.0) >= self.GATE_MIN_REDUCTION:
+            return False
+        best["psnr_db"] = None
+        best["score"] = max(best.get("score", 0.0), 90.0)
+        self.log.info(
+            f"\n⏭️  Skipping quality gate: reduction {best.get('reduction', 0.0):.1f}% "
+            f"< {self.GATE_MIN_REDUCTION:.0f}%"
+        )
+        return True
+
     def _try_safer_alternatives(
         self, 
         original: Path, 
-        candidates: List[Tuple[str, Path]], 
+        candidates: List[Tuple[str, Path, int]], 
         failed_metrics
     ) -> Optional[Dict]:
         """Try safer compression alternatives when quality gates fail."""
-        for alt in ("high_quality", "conservative"):
-            alt_file = next((p for m, p in candidates if m == alt and p.exists()), None)
-            if not alt_file:
-                continue
+        self._run_deferred_alternatives(original, candidates)
+        alts = [
+            (alt, p, size)
+            for alt in self.SAFER_ALTERNATIVES
+            for m, p, size in candidates
+            if m == alt
+        ]
+        # All alternatives in one evaluation: rasterized concurrently, one batched LPIPS pass
+        try:
+            evaluated = self.quality_checker.evaluate_quality_batch(
+                original, [p for _, p, _ in alts], self._gate_renderer()
+            )
+        except Exception as e:
+            self.log.warning(f"⚠️  Error testing alternatives: {e}")
+            evaluated = []
+
+        for (alt, alt_file, alt_size), (passed, alt_metrics) in zip(alts, evaluated):
+            if passed:
+                self.log.info(f"✅ Alternative '{alt}' passed quality gates")
+                result = {
+                    "method": alt, 
+                    "file": alt_file, 
+                    "size": alt_size,
+                    "score": 96.0, 
+                    "reduction": 0.0
+                }
                 
-            try:
-                passed, alt_metrics = self.quality_checker.evaluate_quality(original, alt_file)
-                if passed:
-                    print(f"✅ Alternative '{alt}' passed quality gates")
-                    result = {
-                        "method": alt, 
-                        "file": alt_file, 
-                        "score": 96.0, 
-                        "reduction": 0.0
-                    }
+                # Add metrics
+                if alt_metrics.psnr is not None:
+                    result["psnr_db"] = alt_metrics.psnr
+                if alt_metrics.ssim is not None:
+                    result["ssim"] = alt_metrics.ssim
+                if alt_metrics.lpips is not None:
+                    result["lpips"] = alt_metrics.lpips
                     
-                    # Add metrics
-                    if alt_metrics.psnr is not None:
-                        result["psnr_db"] = alt_metrics.psnr
-                    if alt_metrics.ssim is not None:
-                        result["ssim"] = alt_metrics.ssim
-                    if alt_metrics.lpips is not None:
-                        result["lpips"] = alt_metrics.lpips
-                        
-                    return result
-            except Exception as e:
-                print(f"⚠️  Error testing alternative '{alt}': {e}")
-                continue
+                return result
 
-        print("🛡️  No alternative passed quality gates; preserving original.")
+        self.log.info("🛡️  No alternative passed quality gates; preserving original.")
         return None
 
     def _apply_psnr_quality_gate(
         self,
         original: Path,
-        candidates: List[Tuple[str, Path]],
+        candidates: List[Tuple[str, Path, int]],
         best: Optional[Dict],
     ) -> Optional[Dict]:
         if not best:
             return None
+        if self._skip_gate(best):
+            return best
 
         # Content-aware PSNR threshold
         THRESHOLD_DB = 35.0
@@ -970,104 +2543,276 @@ class PDFCompressor:
                 THRESHOLD_DB = 30.0
             elif prof.get('mode') == 'grayscale':
                 THRESHOLD_DB = 33.0
+        if not (HAS_PDFIUM or self.tools.get("gs")):
+            return best
+        # The original is rasterized once (alongside the winner) and reused for every
+        # candidate tried below
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            media = self._page_media_points(original)
+            original_pages = pool.submit(
+                self._in_worker(self._raster_pages), original, 3, 200, 2, media
+            )
+            return self._psnr_gate_vs_cached(
+                original, original_pages, candidates, best, THRESHOLD_DB, media
+            )
+
+    def _psnr_gate_vs_cached(
+        self,
+        original: Path,
+        original_pages: "Future[Optional[List[Any]]]",
+        candidates: List[Tuple[str, Path, int]],
+        best: Dict,
+        threshold_db: float,
+        media: Optional[Tuple[float, float]] = None,
+    ) -> Optional[Dict]:
         try:
-            psnr = self._compute_average_psnr(original, best["file"])
+            psnr = self._compute_psnr_vs_cached(original_pages, best["file"], media=media)
         except Exception:
             psnr = None
 
         if psnr is None:
             return best
 
-        print(f"\n🔎 Quality gate (PSNR): {psnr:.2f} dB (threshold {THRESHOLD_DB} dB)")
-        if psnr >= THRESHOLD_DB:
+        self.log.info(f"\n🔎 Quality gate (PSNR): {psnr:.2f} dB (threshold {threshold_db} dB)")
+        if psnr >= threshold_db:
             best["score"] = max(best.get("score", 0.0), 95.0)
             best["psnr_db"] = psnr
             return best
 
-        print("⚠️  Below PSNR threshold, trying safer alternatives…")
-        for alt in ("high_quality", "conservative"):
-            alt_file = next((p for m, p in candidates if m == alt and p.exists()), None)
+        self.log.warning("⚠️  Below PSNR threshold, trying safer alternatives…")
+        self._run_deferred_alternatives(original, candidates)
+        for alt in self.SAFER_ALTERNATIVES:
+            alt_file, alt_size = next(
+                ((p, size) for m, p, size in candidates if m == alt), (None, 0)
+            )
             if not alt_file:
                 continue
             alt_psnr = None
             try:
-                alt_psnr = self._compute_average_psnr(original, alt_file)
+                alt_psnr = self._compute_psnr_vs_cached(original_pages, alt_file, media=media)
             except Exception:
                 pass
-            if alt_psnr is not None and alt_psnr >= THRESHOLD_DB:
-                print(f"✅ Alternative '{alt}' passed with {alt_psnr:.2f} dB")
-                return {"method": alt, "file": alt_file, "score": 96.0, "reduction": 0.0, "psnr_db": alt_psnr}
+            if alt_psnr is not None and alt_psnr >= threshold_db:
+                self.log.info(f"✅ Alternative '{alt}' passed with {alt_psnr:.2f} dB")
+                return {
+                    "method": alt,
+                    "file": alt_file,
+                    "size": alt_size,
+                    "score": 96.0,
+                    "reduction": 0.0,
+                    "psnr_db": alt_psnr,
+                }
 
-        print("🛡️  No alternative passed the quality gate; preserving original.")
+        self.log.info("🛡️  No alternative passed the quality gate; preserving original.")
         return None
 
-    def _compute_average_psnr(self, pdf_a: Path, pdf_b: Path, pages: int = 3, dpi: int = 200) -> Optional[float]:
-        if not self.tools.get("gs"):
+    def _compute_average_psnr(
+        self, pdf_a: Path, pdf_b: Path, pages: int = 3, dpi: int = 200, downscale: int = 2
+    ) -> Optional[float]:
+        if not (HAS_PDFIUM or self.tools.get("gs")):
+            return None
+        # Both rasterizations are independent: overlap them
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            media = self._page_media_points(pdf_a)
+            ref = pool.submit(
+                self._in_worker(self._raster_pages), pdf_a, pages, dpi, downscale, media
+            )
+            return self._compute_psnr_vs_cached(ref, pdf_b, pages, dpi, downscale, media)
+
+    def _compute_psnr_vs_cached(
+        self,
+        ref: "Future[Optional[List[Any]]]",
+        pdf_b: Path,
+        pages: int = 3,
+        dpi: int = 200,
+        downscale: int = 2,
+        media: Optional[Tuple[float, float]] = None,
+    ) -> Optional[float]:
+        """Average PSNR of pdf_b against reference pages from _raster_pages
+        (same pages/dpi/downscale).
+
+        ref may still be rendering; it is only waited on once pdf_b is rasterized. media must
+        match what ref was rendered with so both rasters have identical dimensions.
+        """
+        cand = self._raster_pages(pdf_b, pages, dpi, downscale, media)
+        ref_pages = ref.result()
+        if not cand or not ref_pages:
             return None
-        with tempfile.TemporaryDirectory() as d1, tempfile.TemporaryDirectory() as d2:
-            out1 = Path(d1)
-            out2 = Path(d2)
-            ok1 = self._rasterize_pdf_to_pngs(pdf_a, out1, pages, dpi)
-            ok2 = self._rasterize_pdf_to_pngs(pdf_b, out2, pages, dpi)
-            if not ok1 or not ok2:
-                return None
-            pairs: List[Tuple[Path, Path]] = []
-            for i in range(1, pages + 1):
-                p1 = out1 / f"page-{i:03d}.png"
-                p2 = out2 / f"page-{i:03d}.png"
-                if p1.exists() and p2.exists():
-                    pairs.append((p1, p2))
-            if not pairs:
-                return None
-
-            try:
-                from PIL import Image  # type: ignore
-            except Exception:
-                Image = None  # type: ignore
-            try:
-                import numpy as np  # type: ignore
-            except Exception:
-                np = None  # type: ignore
-            try:
-                import cv2  # type: ignore
-            except Exception:
-                cv2 = None  # type: ignore
-
-            if 'np' not in locals() or np is None:  # type: ignore
-                return None
 
-            psnrs: List[float] = []
-            for a, b in pairs:
-                arr_a = self._read_image_to_array(a, Image, np, cv2)
-                arr_b = self._read_image_to_array(b, Image, np, cv2)
-                if arr_a is None or arr_b is None:
-                    continue
+        psnrs: List[float] = []
+        diff = None
+        log10 = math.log10
+        for arr_a, arr_b in zip(ref_pages, cand):
+            if arr_a.shape != arr_b.shape:
+                # Media size not fixed (no pikepdf, or PDFium): compare the overlap
                 h = min(arr_a.shape[0], arr_b.shape[0])
                 w = min(arr_a.shape[1], arr_b.shape[1])
                 arr_a = arr_a[:h, :w]
                 arr_b = arr_b[:h, :w]
-                mse = float(np.mean((arr_a.astype('float32') - arr_b.astype('float32')) ** 2))
-                if mse == 0:
-                    psnrs.append(100.0)
-                else:
-                    psnr = 20 * math.log10(255.0) - 10 * math.log10(mse)
-                    psnrs.append(psnr)
-            if not psnrs:
+            if HAS_CV2:
+                # Sum of squared differences in one SIMD pass, without a difference buffer
+                mse = cv2.norm(arr_a, arr_b, cv2.NORM_L2SQR) / arr_a.size
+            else:
+                h, w = arr_a.shape[:2]
+                # int16 difference (reused across same-size pages), squared and summed in one pass;
+                # accumulate in int64 since int16 squares overflow
+                if diff is None or diff.shape != (h, w):
+                    diff = np.empty((h, w), dtype=np.int16)
+                np.subtract(arr_a, arr_b, out=diff, dtype=np.int16)
+                mse = float(np.einsum('ij,ij->', diff, diff, dtype=np.int64)) / diff.size
+            psnrs.append(_PSNR_PEAK_DB - 10 * log10(mse) if mse else 100.0)
+        if not psnrs:
+            return None
+        return float(sum(psnrs) / len(psnrs))
+
+    def _raster_pages(
+        self,
+        pdf: Path,
+        pages: int,
+        dpi: int,
+        downscale: int = 1,
+        media: Optional[Tuple[float, float]] = None,
+        color: bool = False,
+        rgb: bool = False,
+    ) -> Optional[List[Any]]:
+        """Grayscale (or, with color=True, BGR; with rgb=True, RGB) uint8 rasters of the first
+        pages at dpi/downscale.
+
+        Rendered in-process with PDFium when available (no gs startup, no PNG round-trip),
+        else via Ghostscript PNGs, box-downsampled by the device (-dDownScaleFactor).
+        Results are memoized (read-only) for the file being compressed, so the original and
+        surviving candidates are rendered once across selection stages and the quality gates.
+        """
+        cache = getattr(self._local, "raster_cache", None)
+        if cache is None:
+            return self._render_pages(pdf, pages, dpi, downscale, media, color, rgb)
+        # PDFium renders at dpi/downscale directly and ignores media: key on the effective dpi
+        # so e.g. 200/2 and 100/1 share one entry
+        key = (
+            (str(pdf), dpi / downscale, 1, None, color, rgb)
+            if HAS_PDFIUM
+            else (str(pdf), dpi, downscale, media, color, rgb)
+        )
+        hit = cache.get(key)
+        # A render of more pages (or of the whole, shorter document) also serves fewer pages
+        if hit is not None and (hit[0] >= pages or len(hit[1]) < hit[0]):
+            return hit[1][:pages]
+        rasters = self._render_pages(pdf, pages, dpi, downscale, media, color, rgb)
+        if rasters:
+            for arr in rasters:
+                arr.flags.writeable = False
+            cache.put(key, pages, rasters)
+        return rasters
+
+    def _render_pages(
+        self,
+        pdf: Path,
+        pages: int,
+        dpi: int,
+        downscale: int = 1,
+        media: Optional[Tuple[float, float]] = None,
+        color: bool = False,
+        rgb: bool = False,
+    ) -> Optional[List[Any]]:
+        color = color or rgb
+        if HAS_PDFIUM:
+            try:
+                return (
+                    self._render_pdfium(pdf, pages, dpi / downscale, grayscale=not color, rgb=rgb)
+                    or None
+                )
+            except Exception:
+                pass
+        if not self.tools.get("gs"):
+            return None
+        with tempfile.TemporaryDirectory(dir=self._scratch_dir()) as d:
+            outdir = Path(d)
+            if not self._rasterize_pdf_to_pngs(pdf, outdir, pages, dpi, downscale, media):
                 return None
-            return float(sum(psnrs) / len(psnrs))
+            arrays = [
+                self._read_image_to_array(p, color) for p in sorted(outdir.glob('page-*.png'))
+            ]
+            if rgb:
+                arrays = [np.ascontiguousarray(a[..., ::-1]) for a in arrays if a is not None]
+            return [a for a in arrays if a is not None] or None
+
+    @staticmethod
+    def _render_pdfium(
+        pdf: Path, pages: int, dpi: float, grayscale: bool = True, rgb: bool = False
+    ) -> List[Any]:
+        # PDFium is not thread-safe: one document at a time per process.
+        # Color pages come out as BGR, OpenCV's native order, or RGB with rgb=True (PDFium
+        # reverses the byte order itself): either way no channel swizzle copy is needed
+        with _PDFIUM_LOCK:
+            doc = pdfium.PdfDocument(str(pdf))
+            try:
+                rasters = []
+                for i in range(min(pages, len(doc))):
+                    page = doc[i]
+                    try:
+                        bitmap = page.render(scale=dpi / 72, grayscale=grayscale, rev_byteorder=rgb)
+                        rasters.append(bitmap.to_numpy().copy())
+                    finally:
+                        page.close()
+                return rasters
+            finally:
+                doc.close()
+
+    def _render_pages_rgb(self, pdf: Path, dpi: int) -> List[Any]:
+        """Every page as an RGB uint8 array: the advanced quality gates' in-process renderer.
+
+        Goes through the per-file raster cache, so a candidate checked both as the winner and
+        as a safer alternative is rendered once.
+        """
+        return self._raster_pages(pdf, sys.maxsize, dpi, rgb=True) or []
 
-    def _read_image_to_array(self, path: Path, Image, np, cv2) -> Optional[Any]:
+    @staticmethod
+    def _read_image_to_array(path: Path, color: bool = False) -> Optional[Any]:
+        """Decode a PNG to a grayscale (or BGR) uint8 array."""
         try:
-            if cv2 is not None:
-                return cv2.imread(str(path), cv2.IMREAD_GRAYSCALE)
-            if Image is not None and np is not None:
-                return np.array(Image.open(path).convert('L'))
+            data = _read_once(path)
+            if HAS_CV2:
+                flags = cv2.IMREAD_COLOR if color else cv2.IMREAD_GRAYSCALE
+                return cv2.imdecode(np.frombuffer(data, dtype=np.uint8), flags)
+            if HAS_PIL:
+                if color:
+                    return np.array(Image.open(io.BytesIO(data)).convert('RGB'))[:, :, ::-1]
+                return np.array(Image.open(io.BytesIO(data)).convert('L'))
         except Exception:
             return None
         return None
 
-    def _rasterize_pdf_to_pngs(self, pdf: Path, outdir: Path, pages: int, dpi: int) -> bool:
+    def _page_media_points(self, pdf: Path) -> Optional[Tuple[float, float]]:
+        """Displayed width/height in points of page 1 (MediaBox, honoring /Rotate), via pikepdf."""
+        if not HAS_PIKEPDF:
+            return None
+        try:
+            with pikepdf.open(pdf) as doc:
+                page = doc.pages[0]
+                x0, y0, x1, y1 = (float(v) for v in page.mediabox)
+                width, height = abs(x1 - x0), abs(y1 - y0)
+                if int(page.obj.get("/Rotate", 0)) % 180:
+                    width, height = height, width
+                return width, height
+        except Exception:
+            return None
+
+    def _rasterize_pdf_to_pngs(
+        self,
+        pdf: Path,
+        outdir: Path,
+        pages: int,
+        dpi: int,
+        downscale: int = 1,
+        media: Optional[Tuple[float, float]] = None,
+    ) -> bool:
         out_pattern = str(outdir / 'page-%03d.png')
+        # A fixed page size makes rasters of different PDFs directly comparable (no off-by-one rows)
+        fixed_media = [
+            "-dFIXEDMEDIA",
+            f"-dDEVICEWIDTHPOINTS={media[0]:.2f}",
+            f"-dDEVICEHEIGHTPOINTS={media[1]:.2f}",
+        ] if media else []
         cmd = [
             self.tools["gs"],
             "-dSAFER",
@@ -1077,20 +2822,110 @@ class PDFCompressor:
             f"-r{dpi}",
             "-dTextAlphaBits=4",
             "-dGraphicsAlphaBits=4",
+            # The rasterizer (unlike pdfwrite) can render bands on several threads
+            "-dNumRenderingThreads=4",
+            "-dBufferSpace=200000000",
             "-dFirstPage=1",
             f"-dLastPage={pages}",
+            *([f"-dDownScaleFactor={downscale}"] if downscale > 1 else []),
+            *fixed_media,
             f"-sOutputFile={out_pattern}",
             str(pdf),
         ]
         try:
-            subprocess.run(cmd, capture_output=True, text=True, timeout=180)
+            _run_silent(cmd, timeout=180)
             return len(list(outdir.glob('page-*.png'))) > 0
         except Exception:
             return False
 
-    def _rasterize_pdf_full_to_pngs(self, pdf: Path, outdir: Path, dpi: int = 300) -> bool:
-        """Rasterize all pages to PNG RGB using Ghostscript."""
+    def _iter_pages_bgr(self, pdf: Path, dpi: int) -> Iterator[Any]:
+        """Yield every page as a BGR uint8 array, one at a time (PDFium, else Ghostscript PNGs)."""
+        doc = None
+        if HAS_PDFIUM:
+            try:
+                with _PDFIUM_LOCK:
+                    doc = pdfium.PdfDocument(str(pdf))
+            except Exception:
+                doc = None
+        if doc is not None:
+            try:
+                for i in range(len(doc)):
+                    # Locked per page: other files can render while this page is being processed
+                    with _PDFIUM_LOCK:
+                        page = doc[i]
+                        try:
+                            bgr = page.render(scale=dpi / 72).to_numpy().copy()
+                        finally:
+                            page.close()
+                    yield bgr
+            finally:
+                with _PDFIUM_LOCK:
+                    doc.close()
+            return
+
+        if not (self.tools.get("gs") and HAS_CV2):
+            return
+        # Ghostscript renders RASTER_CHUNK_PAGES at a time on a producer thread while the caller
+        # processes the previous chunk; each PNG is deleted once read
+        count = self._page_count(pdf)
+        step = self.RASTER_CHUNK_PAGES
+        ranges = (
+            [(first, min(first + step - 1, count)) for first in range(1, count + 1, step)]
+            if count
+            else [(None, None)]
+        )
+        with tempfile.TemporaryDirectory(dir=self._scratch_dir()) as d:
+            ready: "queue.Queue[Optional[Path]]" = queue.Queue(maxsize=1)
+            stop = threading.Event()
+
+            def produce() -> None:
+                try:
+                    for n, (first, last) in enumerate(ranges):
+                        chunk_dir = Path(d) / f"chunk-{n:04d}"
+                        chunk_dir.mkdir()
+                        if stop.is_set() or not self._rasterize_pdf_full_to_pngs(
+                            pdf, chunk_dir, dpi, first, last
+                        ):
+                            break
+                        while not stop.is_set():
+                            try:
+                                ready.put(chunk_dir, timeout=0.5)
+                                break
+                            except queue.Full:
+                                continue
+                finally:
+                    ready.put(None)
+
+            producer = threading.Thread(target=produce, daemon=True)
+            producer.start()
+            try:
+                for chunk_dir in iter(ready.get, None):
+                    for png in sorted(chunk_dir.glob('page-*.png')):
+                        img = cv2.imread(str(png), cv2.IMREAD_COLOR)
+                        png.unlink()
+                        if img is not None:
+                            yield img
+            finally:
+                # The caller may stop early: let the producer finish its gs run before cleanup
+                stop.set()
+                while producer.is_alive():
+                    try:
+                        ready.get(timeout=0.5)
+                    except queue.Empty:
+                        pass
+                producer.join()
+
+    def _rasterize_pdf_full_to_pngs(
+        self,
+        pdf: Path,
+        outdir: Path,
+        dpi: int = 300,
+        first: Optional[int] = None,
+        last: Optional[int] = None,
+    ) -> bool:
+        """Rasterize all pages (or pages first..last) to PNG RGB using Ghostscript."""
         out_pattern = str(outdir / 'page-%03d.png')
+        page_range = [f"-dFirstPage={first}", f"-dLastPage={last}"] if first else []
         cmd = [
             self.tools["gs"],
             "-dSAFER",
@@ -1100,35 +2935,64 @@ class PDFCompressor:
             f"-r{dpi}",
             "-dTextAlphaBits=4",
             "-dGraphicsAlphaBits=4",
+            *page_range,
             f"-sOutputFile={out_pattern}",
             str(pdf),
         ]
         try:
-            subprocess.run(cmd, capture_output=True, text=True, timeout=600)
+            _run_silent(cmd, timeout=600)
             return len(list(outdir.glob('page-*.png'))) > 0
         except Exception:
             return False
 
-    def _assemble_images_to_pdf(self, images: List[Path]) -> Optional[Path]:
-        """Assemble a list of images into a PDF using Ghostscript."""
+    def _assemble_images_to_pdf(self, images: List[bytes], dpi: int = 300) -> Optional[Path]:
+        """Assemble encoded page images (PNG/JPEG bytes) rendered at dpi into a PDF.
+
+        img2pdf embeds the data as-is from memory (no decode/re-encode, no subprocess, no
+        page files); Ghostscript, fed page files, is the fallback.
+        """
         if not images:
             return None
-        out_pdf = Path(tempfile.mktemp(suffix="_images.pdf"))
-        cmd = [
-            self.tools["gs"],
-            "-sDEVICE=pdfwrite",
-            "-dNOPAUSE",
-            "-dBATCH",
-            "-dQUIET",
-            "-dAutoRotatePages=/None",
-            f"-sOutputFile={out_pdf}",
-        ] + [str(p) for p in images]
-        try:
-            r = subprocess.run(cmd, capture_output=True, text=True, timeout=600)
-            if r.returncode == 0 and out_pdf.exists():
-                return out_pdf
-        except Exception:
+        out_pdf = self._temp_path("_images.pdf")
+        if HAS_IMG2PDF:
+            try:
+                with open(out_pdf, "wb") as f:
+                    img2pdf.convert(
+                        images,
+                        layout_fun=img2pdf.get_fixed_dpi_layout_fun((dpi, dpi)),
+                        outputstream=f,
+                    )
+                if self._produced(out_pdf):
+                    return out_pdf
+            except Exception:
+                pass
+        if not self.tools.get("gs"):
+            self._discard_candidate(out_pdf)
             return None
+        with tempfile.TemporaryDirectory(dir=self._scratch_dir()) as d:
+            paths = []
+            for page_no, data in enumerate(images, start=1):
+                # JPEG data starts with an SOI marker
+                suffix = ".jpg" if data.startswith(b"\xff\xd8") else ".png"
+                path = Path(d) / f"page-{page_no:03d}{suffix}"
+                path.write_bytes(data)
+                paths.append(str(path))
+            cmd = [
+                self.tools["gs"],
+                "-sDEVICE=pdfwrite",
+                "-dNOPAUSE",
+                "-dBATCH",
+                "-dQUIET",
+                "-dAutoRotatePages=/None",
+                f"-sOutputFile={out_pdf}",
+            ] + paths
+            try:
+                r = _run_silent(cmd, timeout=600)
+                if r.returncode == 0 and self._produced(out_pdf):
+                    return out_pdf
+            except Exception:
+                pass
+        self._discard_candidate(out_pdf)
         return None
 
     def _denoise_raster(self, pdf: Path) -> Optional[Path]:
@@ -1136,106 +3000,117 @@ class PDFCompressor:
 
         Requires numpy + opencv; skips gracefully if unavailable.
         """
-        try:
-            import numpy as np  # type: ignore
-            import cv2  # type: ignore
-            from PIL import Image  # type: ignore
-        except Exception:
+        if not HAS_CV2:
             return None
 
-        with tempfile.TemporaryDirectory() as td, tempfile.TemporaryDirectory() as to:
-            src_dir = Path(td)
-            out_dir = Path(to)
-            if not self._rasterize_pdf_full_to_pngs(pdf, src_dir, dpi=300):
-                return None
+        prof = getattr(self, '_content_profile', None)
+        mode = prof.get('mode') if prof else None
+
+        # OpenCV releases the GIL, so pages are filtered on threads (no pickling of page arrays).
+        # Only the encoded pages are kept (tens of KB each), in memory rather than as files
+        workers = max(1, self.max_parallel_strategies or self._strategy_slots)
+        processed: List[Optional[bytes]] = []
+        pending: "deque[Future[Optional[bytes]]]" = deque()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for img in self._iter_pages_bgr(pdf, dpi=300):
+                pending.append(pool.submit(_denoise_page, img, mode))
+                # Bounded window: only a few decoded 300 dpi pages are in memory at once
+                if len(pending) >= 2 * workers:
+                    processed.append(pending.popleft().result())
+            processed.extend(f.result() for f in pending)
+        pages = [p for p in processed if p is not None]
+
+        if not pages:
+            return None
+        # Assemble to PDF
+        return self._assemble_images_to_pdf(pages, dpi=300)
 
-            prof = getattr(self, '_content_profile', None)
-            mode = prof.get('mode') if prof else None
+    # ---------- utils ----------
+    def _temp_path(self, suffix: str) -> Path:
+        """Create a private temp file (race-free, unlike mktemp) in the configured temp dir."""
+        with tempfile.NamedTemporaryFile(suffix=suffix, dir=self._scratch_dir(), delete=False) as f:
+            return Path(f.name)
+
+    def _scratch_dir(self) -> Optional[str]:
+        """The current file's work dir; else --tmpdir/$PDF_COMPRESS_TMP if set, else /dev/shm when
+        it can hold this file's intermediates."""
+        workdir = getattr(self._local, "workdir", None)
+        if workdir:
+            return workdir
+        if self.tmpdir:
+            return self.tmpdir
+        try:
+            free = shutil.disk_usage(RAMDISK_DIR).free
+        except OSError:
+            return None
+        needed = max(RAMDISK_MIN_FREE, RAMDISK_HEADROOM * getattr(self._local, "input_size", 0))
+        return str(RAMDISK_DIR) if free >= needed else None
 
-            processed: List[Path] = []
-            for png in sorted(src_dir.glob('page-*.png')):
-                try:
-                    img = cv2.imread(str(png), cv2.IMREAD_COLOR)
-                    if img is None:
-                        continue
-                    if mode == 'bitonal':
-                        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-                        blur = cv2.GaussianBlur(gray, (3, 3), 0)
-                        th = cv2.adaptiveThreshold(blur, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
-                                                   cv2.THRESH_BINARY, 19, 9)
-                        # Optional small opening to remove speckle
-                        kernel = np.ones((2, 2), np.uint8)
-                        th = cv2.morphologyEx(th, cv2.MORPH_OPEN, kernel)
-                        out = th
-                        save_gray = True
-                    elif mode == 'grayscale':
-                        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-                        dn = cv2.fastNlMeansDenoising(gray, None, h=8, templateWindowSize=7, searchWindowSize=21)
-                        # Unsharp mask
-                        g = cv2.GaussianBlur(dn, (0, 0), 0.8)
-                        us = cv2.addWeighted(dn, 1.5, g, -0.5, 0)
-                        out = us
-                        save_gray = True
-                    else:
-                        # color: chroma denoise + luma sharpen
-                        ycrcb = cv2.cvtColor(img, cv2.COLOR_BGR2YCrCb)
-                        y, cr, cb = cv2.split(ycrcb)
-                        cr = cv2.fastNlMeansDenoising(cr, None, h=5)
-                        cb = cv2.fastNlMeansDenoising(cb, None, h=5)
-                        # Sharpen luma
-                        g = cv2.GaussianBlur(y, (0, 0), 0.8)
-                        y = cv2.addWeighted(y, 1.4, g, -0.4, 0)
-                        ycrcb = cv2.merge([y, cr, cb])
-                        out = cv2.cvtColor(ycrcb, cv2.COLOR_YCrCb2BGR)
-                        save_gray = False
-
-                    out_path = out_dir / png.name
-                    if save_gray:
-                        cv2.imwrite(str(out_path), out)
-                    else:
-                        cv2.imwrite(str(out_path), out, [cv2.IMWRITE_PNG_COMPRESSION, 3])
-                    processed.append(out_path)
-                except Exception:
-                    continue
+    @staticmethod
+    def _produced(path: Path) -> bool:
+        """True when a tool actually wrote output (temp files are pre-created empty)."""
+        try:
+            return path.stat().st_size > 0
+        except OSError:
+            return False
 
-            if not processed:
-                return None
-            # Assemble to PDF
-            return self._assemble_images_to_pdf(processed)
+    @staticmethod
+    def _fadvise(path: Path, advice: str) -> None:
+        """posix_fadvise the whole file with os.<advice> (a no-op where unsupported)."""
+        if not hasattr(os, "posix_fadvise"):
+            return
+        try:
+            fd = os.open(path, os.O_RDONLY)
+            try:
+                os.posix_fadvise(fd, 0, 0, getattr(os, advice))
+            finally:
+                os.close(fd)
+        except OSError:
+            pass
+
+    @classmethod
+    def _prefetch(cls, path: Path) -> None:
+        """Ask the kernel to read the input ahead: every strategy's gs/qpdf pass reads it
+        in full."""
+        cls._fadvise(path, "POSIX_FADV_WILLNEED")
 
-    # ---------- utils ----------
     def _move_processed_file(self, pdf: Path) -> None:
         processed_dir = self.input_dir / "processed"
         processed_dir.mkdir(exist_ok=True)
         dest = processed_dir / pdf.name
-        shutil.move(str(pdf), str(dest))
-        print(f"📁 Moved to: {dest}")
+        self._finalize_output(pdf, dest)
+        self.log.info(f"📁 Moved to: {dest}")
 
     def show_summary(self, results: List[Dict]) -> None:
         if not results:
             return
-        print("\n" + "=" * 70)
-        print("🚀 FINAL SUMMARY")
-        print("=" * 70)
+        self.log.info("\n" + "=" * 70)
+        self.log.info("🚀 FINAL SUMMARY")
+        self.log.info("=" * 70)
         total_o = 0.0
         total_f = 0.0
         ok = 0
         for r in results:
             if "error" in r:
-                print(f"❌ {r['original_file']}: {r['error']}")
+                self.log.warning(f"❌ {r['original_file']}: {r['error']}")
                 continue
             ok += 1
             total_o += r["original_size_mb"]
             total_f += r["final_size_mb"]
-            print(f"✅ {r['original_file']}")
-            print(f"   📊 {r['original_size_mb']:.2f} MB → {r['final_size_mb']:.2f} MB ({r['reduction_percent']:.1f}%)")
-            print(f"   🏆 {r['winner_method']} (quality: {r.get('quality_score', 0):.1f}/100)")
+            self.log.info(f"✅ {r['original_file']}")
+            self.log.info(
+                f"   📊 {r['original_size_mb']:.2f} MB → {r['final_size_mb']:.2f} MB "
+                f"({r['reduction_percent']:.1f}%)"
+            )
+            self.log.info(
+                f"   🏆 {r['winner_method']} (quality: {r.get('quality_score', 0):.1f}/100)"
+            )
         if ok > 0 and total_o > 0:
             reduction_total = ((total_o - total_f) / total_o) * 100
-            print("\n🎯 TOTALS:")
-            print(f"   📁 Processed: {ok}/{len(results)}")
-            print(f"   📊 {total_o:.2f} MB → {total_f:.2f} MB ({reduction_total:.1f}%)")
-            print(f"   💾 Saved: {total_o - total_f:.2f} MB")
+            self.log.info("\n🎯 TOTALS:")
+            self.log.info(f"   📁 Processed: {ok}/{len(results)}")
+            self.log.info(f"   📊 {total_o:.2f} MB → {total_f:.2f} MB ({reduction_total:.1f}%)")
+            self.log.info(f"   💾 Saved: {total_o - total_f:.2f} MB")
 
 
 def main() -> None:
@@ -1262,8 +3137,44 @@ Examples:
                        help="Disable anonymous telemetry (enabled by default)")
     parser.add_argument("--anti-noise", action="store_true",
                        help="Reduce compression artifacts using text/gray-safe filters and optional grayscale")
+    parser.add_argument("--jobs", "-j", type=int, default=None,
+                       help="Number of PDFs to process in parallel (default: CPU count)")
+    parser.add_argument("--max-parallel-strategies", type=int, default=None,
+                       help="Max strategies run concurrently per PDF (default: CPU count divided "
+                            "among the files in flight); lower it to cap memory")
+    parser.add_argument("--always-gate", action="store_true",
+                       help="Run the quality gate even when the winner shrinks the file by "
+                            "less than 15%%")
+    parser.add_argument("--persistent-gs", action="store_true",
+                       help="Reuse long-lived Ghostscript interpreters across files to "
+                            "amortize startup")
+    parser.add_argument("--force-all", "--exhaustive", dest="force_all", action="store_true",
+                       help="Run every applicable strategy instead of skipping those the content "
+                            "heuristics rule out")
+    parser.add_argument("--tmpdir", default=None,
+                       help="Directory for intermediate candidate PDFs "
+                            "(default: $PDF_COMPRESS_TMP or $TMPDIR)")
+    parser.add_argument("--batch-dedupe", action="store_true",
+                       help="Also compress the whole batch in one Ghostscript pass so shared "
+                            "images/fonts are processed once")
+    parser.add_argument("--coalesce-gs", action="store_true",
+                       help="Render a file's Ghostscript strategies in one gs process "
+                            "instead of one process each")
+    parser.add_argument("--no-cache", action="store_true",
+                       help="Recompress every input even if identical content was "
+                            "compressed before")
+    parser.add_argument("--target-ratio", type=float, default=0.8,
+                       help="Early stop: end the strategy search once a candidate is at most this "
+                            "fraction of the original size and passes --min-psnr (default: 0.8)")
+    parser.add_argument("--min-psnr", type=float, default=40.0,
+                       help="Early stop: minimum quick-check PSNR in dB for --target-ratio "
+                            "(default: 40)")
+    parser.add_argument("--stage-input", action="store_true",
+                       help="Copy each input into the scratch dir once and run all "
+                            "strategies on the copy")
     
     args = parser.parse_args()
+    _setup_logging()
     
     try:
         c = PDFCompressor(
@@ -1271,14 +3182,26 @@ Examples:
             output_dir=args.output, 
             enable_advanced_gates=args.advanced_gates,
             enable_telemetry=not args.disable_telemetry,
-            enable_anti_noise=args.anti_noise
+            enable_anti_noise=args.anti_noise,
+            max_workers=args.jobs,
+            max_parallel_strategies=args.max_parallel_strategies,
+            always_gate=args.always_gate,
+            persistent_gs=args.persistent_gs,
+            force_all=args.force_all,
+            tmpdir=args.tmpdir,
+            batch_dedupe=args.batch_dedupe,
+            coalesce_gs=args.coalesce_gs,
+            result_cache=not args.no_cache,
+            stage_input=args.stage_input,
+            target_ratio=args.target_ratio,
+            min_psnr=args.min_psnr
         )
         res = c.process_all_pdfs()
         c.show_summary(res)
     except KeyboardInterrupt:
-        print("\n⚠️  Interrupted by user")
+        logger.warning("\n⚠️  Interrupted by user")
     except Exception as e:
-        print(f"\n❌ Error: {e}")
+        logger.warning(f"\n❌ Error: {e}")
 
 
 if __name__ == "__main__":
@@ -15,12 +15,12 @@ Quality Gates:
   - LPIPS (learned perceptual image patch similarity) - optional, threshold 0.15
 """
 
+import math
 import shutil
 import subprocess
 import tempfile
-import math
 from pathlib import Path
-from typing import List, Dict, Tuple, Optional, Any
+from typing import Any, Dict, List, Optional, Tuple
 
 # Try to import advanced quality gates
 try:
@@ -98,7 +98,12 @@ class PDFCompressor:
         # Ghostscript
         if self.tools["gs"]:
             try:
-                r = subprocess.run([self.tools["gs"], "--version"], capture_output=True, text=True)
+                r = subprocess.run(
+                    [self.tools["gs"], "--version"],
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.DEVNULL,
+                    text=True,
+                )
                 v = r.stdout.strip().split("\n")[0] if r.returncode == 0 else "unknown"
                 print(f"  ✅ Ghostscript: {self.tools['gs']} (v{v})")
             except Exception:
@@ -242,7 +247,9 @@ class PDFCompressor:
             str(tmp),
         ]
         try:
-            r = subprocess.run(cmd, capture_output=True, text=True, timeout=300)
+            r = subprocess.run(
+                cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=300
+            )
             if r.returncode == 0 and tmp.exists():
                 print(f"  ✅ conservative: {tmp.stat().st_size / (1024*1024):.2f} MB")
                 return tmp
@@ -278,7 +285,9 @@ class PDFCompressor:
             str(pdf),
         ]
         try:
-            r = subprocess.run(cmd, capture_output=True, text=True, timeout=300)
+            r = subprocess.run(
+                cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=300
+            )
             if r.returncode == 0 and tmp.exists():
                 print(f"  ✅ high_quality: {tmp.stat().st_size / (1024*1024):.2f} MB")
                 return tmp
@@ -310,7 +319,9 @@ class PDFCompressor:
             str(pdf),
         ]
         try:
-            r = subprocess.run(cmd, capture_output=True, text=True, timeout=300)
+            r = subprocess.run(
+                cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=300
+            )
             if r.returncode == 0 and tmp.exists():
                 print(f"  ✅ balanced: {tmp.stat().st_size / (1024*1024):.2f} MB")
                 return tmp
@@ -343,7 +354,9 @@ class PDFCompressor:
             str(pdf),
         ]
         try:
-            r = subprocess.run(cmd, capture_output=True, text=True, timeout=300)
+            r = subprocess.run(
+                cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=300
+            )
             if r.returncode == 0 and tmp.exists():
                 print(f"  ✅ aggressive_safe: {tmp.stat().st_size / (1024*1024):.2f} MB")
                 return tmp
@@ -602,7 +615,7 @@ class PDFCompressor:
             str(pdf),
         ]
         try:
-            subprocess.run(cmd, capture_output=True, text=True, timeout=180)
+            subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=180)
             return len(list(outdir.glob('page-*.png'))) > 0
         except Exception:
             return False
@@ -16,17 +16,18 @@ Usage:
     result = pipeline.process_scanned_pdf(input_pdf, output_pdf)
 """
 
+import functools
+import json
 import os
 import shutil
 import subprocess
 import tempfile
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple, Union
-import json
 
 try:
-    from PIL import Image
     import numpy as np
+    from PIL import Image
     HAS_PIL = True
 except ImportError:
     HAS_PIL = False
@@ -37,6 +38,9 @@ try:
 except ImportError:
     HAS_CV2 = False
 
+# $PATH lookups are shared by every pipeline in the process
+_which = functools.lru_cache(maxsize=None)(shutil.which)
+
 
 class OCRPipelineConfig:
     """Configuration for OCR/JBIG2 pipeline."""
@@ -131,11 +135,11 @@ class OCRPipeline:
             if tool == "jbig2":
                 # Check for jbig2enc
                 for candidate in ["jbig2", "jbig2enc"]:
-                    if shutil.which(candidate):
-                        tools[tool] = candidate
+                    if _which(candidate):
+                        tools[tool] = _which(candidate)
                         break
             else:
-                tools[tool] = shutil.which(tool)
+                tools[tool] = _which(tool)
         
         return tools
     
@@ -234,25 +238,31 @@ class OCRPipeline:
     
     def _get_page_count(self, pdf_path: Path) -> int:
         """Get number of pages in PDF."""
+        qpdf, gs = self.tools["qpdf"], self.tools["gs"]
         try:
-            cmd = ["qpdf", "--show-npages", str(pdf_path)]
-            result = subprocess.run(cmd, capture_output=True, text=True)
+            if not qpdf:
+                raise FileNotFoundError("qpdf")
+            cmd = [qpdf, "--show-npages", str(pdf_path)]
+            result = subprocess.run(
+                cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+            )
             if result.returncode == 0:
                 return int(result.stdout.strip())
         except Exception:
             pass
         
-        # Fallback using ghostscript
+        # Fallback using ghostscript: read the page tree only, printing just the count
         try:
-            cmd = ["gs", "-q", "-dNOPAUSE", "-dBATCH", "-sDEVICE=nullpage", 
-                   "-c", "eof", str(pdf_path)]
-            result = subprocess.run(cmd, capture_output=True, text=True)
-            # Parse output for page count
-            if "Processing pages" in result.stderr:
-                import re
-                match = re.search(r"Processing pages 1 through (\d+)", result.stderr)
-                if match:
-                    return int(match.group(1))
+            if not gs:
+                raise FileNotFoundError("gs")
+            ps_path = str(pdf_path).replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+            cmd = [gs, "-q", "-dNODISPLAY", "-dBATCH", f"--permit-file-read={pdf_path}",
+                   "-c", f"({ps_path}) (r) file runpdfbegin pdfpagecount = quit"]
+            result = subprocess.run(
+                cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+            )
+            if result.returncode == 0 and result.stdout.strip().isdigit():
+                return int(result.stdout.strip())
         except Exception:
             pass
         
@@ -261,8 +271,13 @@ class OCRPipeline:
     def _has_embedded_text(self, pdf_path: Path) -> bool:
         """Check if PDF has embedded text."""
         try:
-            cmd = ["pdffonts", str(pdf_path)]
-            result = subprocess.run(cmd, capture_output=True, text=True)
+            pdffonts = _which("pdffonts")
+            if not pdffonts:
+                raise FileNotFoundError("pdffonts")
+            cmd = [pdffonts, str(pdf_path)]
+            result = subprocess.run(
+                cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+            )
             if result.returncode == 0:
                 # If pdffonts shows fonts, there's likely embedded text
                 lines = result.stdout.strip().split('\n')
@@ -272,8 +287,12 @@ class OCRPipeline:
         
         # Fallback: try to extract text with qpdf
         try:
-            cmd = ["qpdf", "--filtered-stream-data", "--show-object=1", str(pdf_path)]
-            result = subprocess.run(cmd, capture_output=True, text=True)
+            if not self.tools["qpdf"]:
+                raise FileNotFoundError("qpdf")
+            cmd = [self.tools["qpdf"], "--filtered-stream-data", "--show-object=1", str(pdf_path)]
+            result = subprocess.run(
+                cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+            )
             # Look for text content indicators
             return "BT" in result.stdout or "Tj" in result.stdout
         except Exception:
@@ -291,7 +310,7 @@ class OCRPipeline:
             "avg_dpi": 150.0
         }
         
-        if not HAS_PIL or not HAS_CV2:
+        if not HAS_PIL or not HAS_CV2 or not self.tools["gs"]:
             return analysis
         
         try:
@@ -301,7 +320,7 @@ class OCRPipeline:
                 # Extract page as image
                 img_path = temp_path / f"page_{page_num}.png"
                 cmd = [
-                    "gs", "-dNOPAUSE", "-dBATCH", "-dSAFER",
+                    self.tools["gs"], "-dNOPAUSE", "-dBATCH", "-dSAFER",
                     "-sDEVICE=png16m", "-r150",
                     f"-dFirstPage={page_num + 1}",
                     f"-dLastPage={page_num + 1}",
@@ -309,7 +328,7 @@ class OCRPipeline:
                     str(pdf_path)
                 ]
                 
-                result = subprocess.run(cmd, capture_output=True)
+                result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
                 if result.returncode != 0 or not img_path.exists():
                     return analysis
                 
@@ -432,9 +451,9 @@ class OCRPipeline:
         
         ocr_cmd.extend([str(input_pdf), str(ocr_pdf)])
         
-        ocr_result = subprocess.run(ocr_cmd, capture_output=True, text=True)
+        ocr_result = subprocess.run(ocr_cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
         if ocr_result.returncode != 0:
-            raise Exception(f"OCRmyPDF failed: {ocr_result.stderr}")
+            raise Exception(f"OCRmyPDF failed: {ocr_result.stderr.decode(errors='replace')}")
         
         result.ocr_applied = True
         
@@ -451,10 +470,11 @@ class OCRPipeline:
             str(ocr_pdf)
         ]
         
-        gs_result = subprocess.run(gs_cmd, capture_output=True, text=True)
+        gs_result = subprocess.run(gs_cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
         if gs_result.returncode != 0:
-            # Fallback: copy OCR result directly
-            shutil.copy2(ocr_pdf, output_pdf)
+            # Fallback: use the OCR result directly (a rename when the temp dir shares the
+            # output's filesystem; the temp copy is discarded anyway)
+            shutil.move(str(ocr_pdf), str(output_pdf))
         
         return result
     
@@ -485,9 +505,11 @@ class OCRPipeline:
             gs_cmd.extend(["-dMonoImageFilter=/JBIG2Decode"])
             result.jbig2_applied = True
         
-        gs_result = subprocess.run(gs_cmd, capture_output=True, text=True)
+        gs_result = subprocess.run(gs_cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
         if gs_result.returncode != 0:
-            raise Exception(f"Ghostscript hybrid processing failed: {gs_result.stderr}")
+            raise Exception(
+                f"Ghostscript hybrid processing failed: {gs_result.stderr.decode(errors='replace')}"
+            )
         
         return result
     
@@ -12,37 +12,64 @@ Usage:
     passed, metrics = checker.evaluate_quality(original_pdf, compressed_pdf)
 """
 
+import importlib.util
+import json
 import os
-import tempfile
 import subprocess
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, Optional, Tuple, List, Any
-import json
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 try:
     import numpy as np
     from PIL import Image
     from skimage.metrics import structural_similarity as ssim
-    from skimage.color import rgb2gray
     HAS_SKIMAGE = True
 except ImportError:
     HAS_SKIMAGE = False
 
 try:
-    import torch
-    import lpips
-    HAS_LPIPS = False  # Will be set to True if LPIPS loads successfully
-    
-    # Try to load LPIPS model
-    try:
-        lpips_model = lpips.LPIPS(net='alex')  # or 'vgg', 'squeeze'
-        HAS_LPIPS = True
-    except Exception:
-        lpips_model = None
-        HAS_LPIPS = False
+    import cv2
+    HAS_CV2 = True
 except ImportError:
-    HAS_LPIPS = False
-    lpips_model = None
+    HAS_CV2 = False
+
+# torch + lpips are only checked for here: importing torch and loading the network take
+# seconds, so both happen on the first LPIPS comparison (see _load_lpips)
+HAS_LPIPS = bool(importlib.util.find_spec("torch") and importlib.util.find_spec("lpips"))
+lpips_model = None
+lpips_device = None
+_LPIPS_LOCK = threading.Lock()
+
+# In-process page renderer: (pdf, dpi) -> RGB uint8 page arrays
+Renderer = Callable[[Path, int], List[Any]]
+
+
+def _load_lpips() -> bool:
+    """Load the LPIPS network once per process (on the GPU when there is one);
+    False if unavailable."""
+    global torch, lpips_model, lpips_device, HAS_LPIPS
+    if lpips_model is not None:
+        return True
+    if not HAS_LPIPS:
+        return False
+    with _LPIPS_LOCK:
+        if lpips_model is None:
+            try:
+                import lpips
+                import torch
+                device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+                # All checked pages go through the network in one batch
+                model = lpips.LPIPS(net='alex').to(device).eval()  # or 'vgg', 'squeeze'
+                # Kept in FP32 on every device: lpips_threshold is calibrated against FP32 distances
+                lpips_device = device
+                lpips_model = model
+            except Exception:
+                HAS_LPIPS = False
+                return False
+    return True
 
 
 class QualityGateConfig:
@@ -70,6 +97,10 @@ class QualityGateConfig:
         self.max_pages_to_check = 5
         self.page_selection = "distributed"  # "first", "distributed", "random"
         
+        # Pages are area-downscaled before scoring (long edge in px, 0 = full raster)
+        self.metric_max_edge = 1024  # PSNR/SSIM
+        self.lpips_max_edge = 224    # AlexNet's native input size
+        
     @classmethod
     def from_dict(cls, config_dict: Dict) -> 'QualityGateConfig':
         """Create config from dictionary."""
@@ -92,7 +123,9 @@ class QualityGateConfig:
             'require_majority': self.require_majority,
             'raster_dpi': self.raster_dpi,
             'max_pages_to_check': self.max_pages_to_check,
-            'page_selection': self.page_selection
+            'page_selection': self.page_selection,
+            'metric_max_edge': self.metric_max_edge,
+            'lpips_max_edge': self.lpips_max_edge
         }
 
 
@@ -138,9 +171,17 @@ class QualityMetrics:
 class QualityGateChecker:
     """Advanced quality gate checker with SSIM and LPIPS support."""
     
-    def __init__(self, config: Optional[QualityGateConfig] = None):
+    def __init__(
+        self,
+        config: Optional[QualityGateConfig] = None,
+        renderer: Optional[Renderer] = None,
+    ):
         self.config = config or QualityGateConfig()
+        # Optional in-process renderer (pdf, dpi) -> RGB page arrays; Ghostscript PNGs otherwise
+        self.renderer = renderer
         self._check_dependencies()
+        # Last rasterized original per thread: one original is compared against several candidates
+        self._original_cache = threading.local()
         
     def _check_dependencies(self):
         """Check and warn about missing dependencies."""
@@ -158,104 +199,160 @@ class QualityGateChecker:
             print(f"Warning: Quality gates disabled due to missing dependencies: {', '.join(missing)}")
             print("Install with: pip install scikit-image torch lpips")
     
-    def evaluate_quality(self, original_pdf: Path, compressed_pdf: Path) -> Tuple[bool, QualityMetrics]:
+    def evaluate_quality(
+        self, original_pdf: Path, compressed_pdf: Path, renderer: Optional[Renderer] = None
+    ) -> Tuple[bool, QualityMetrics]:
         """
         Evaluate quality of compressed PDF against original.
         
         Returns:
             Tuple of (passed, metrics) where passed indicates if quality gates passed
         """
-        metrics = QualityMetrics()
+        return self.evaluate_quality_batch(original_pdf, [compressed_pdf], renderer)[0]
+    
+    def evaluate_quality_batch(
+        self, original_pdf: Path, compressed_pdfs: List[Path], renderer: Optional[Renderer] = None
+    ) -> List[Tuple[bool, QualityMetrics]]:
+        """
+        Evaluate several compressed PDFs against the same original.
+        
+        Candidates are rasterized concurrently and LPIPS runs once over every
+        (candidate, page) pair, instead of one network call per page.
+        renderer overrides the checker's default renderer for this call.
+        
+        Returns:
+            One (passed, metrics) tuple per compressed PDF, in order
+        """
+        results = [(True, QualityMetrics()) for _ in compressed_pdfs]
         
         try:
-            # Rasterize both PDFs for comparison
-            original_images = self._rasterize_pdf(original_pdf)
-            compressed_images = self._rasterize_pdf(compressed_pdf)
-            
-            if not original_images or not compressed_images:
-                print("Warning: Could not rasterize PDFs for quality assessment")
-                metrics.overall_passed = True  # Fail open
-                return True, metrics
+            # Rasterize the original (cached) and all candidates; gs runs release the GIL
+            renderer = renderer or self.renderer
+            original_images = self._rasterize_original(original_pdf, renderer)
+            with ThreadPoolExecutor(max_workers=max(1, len(compressed_pdfs))) as pool:
+                compressed_sets = list(
+                    pool.map(lambda p: self._rasterize_pdf(p, renderer), compressed_pdfs)
+                )
             
-            # Ensure same number of pages (take minimum)
-            min_pages = min(len(original_images), len(compressed_images))
-            page_indices = self._select_pages_to_check(min_pages)
-            
-            # Compute metrics for selected pages
-            psnr_values = []
-            ssim_values = []
-            lpips_values = []
-            
-            for page_idx in page_indices:
-                if page_idx >= min_pages:
+            # PSNR/SSIM per page; LPIPS pairs are collected for one batched pass
+            lpips_jobs = []
+            evaluated = []
+            # Downscaled original pages (and their SSIM luminance), shared by all candidates
+            reference: Dict[Tuple[int, Tuple[int, ...]], Any] = {}
+            reference_gray: Dict[Tuple[int, Tuple[int, ...]], Any] = {}
+            for i, compressed_images in enumerate(compressed_sets):
+                metrics = results[i][1]
+                if not original_images or not compressed_images:
+                    print("Warning: Could not rasterize PDFs for quality assessment")
+                    metrics.overall_passed = True  # Fail open
                     continue
+                evaluated.append(i)
                     
-                original_img = original_images[page_idx]
-                compressed_img = compressed_images[page_idx]
-                
-                page_metrics = {'page': page_idx}
-                
-                # PSNR (existing logic)
-                if self.config.psnr_enabled:
-                    psnr = self._compute_psnr(original_img, compressed_img)
-                    if psnr is not None:
-                        psnr_values.append(psnr)
-                        page_metrics['psnr'] = psnr
+                # Ensure same number of pages (take minimum)
+                min_pages = min(len(original_images), len(compressed_images))
+                page_indices = self._select_pages_to_check(min_pages)
                 
-                # SSIM
-                if self.config.ssim_enabled:
-                    ssim_val = self._compute_ssim(original_img, compressed_img)
-                    if ssim_val is not None:
-                        ssim_values.append(ssim_val)
-                        page_metrics['ssim'] = ssim_val
-                
-                # LPIPS
-                if self.config.lpips_enabled:
-                    lpips_val = self._compute_lpips(original_img, compressed_img)
+                for page_idx in page_indices:
+                    if page_idx >= min_pages:
+                        continue
+                        
+                    # Crop to the common size once; every metric below works on the same pair
+                    original_img, compressed_img = self._common_crop(
+                        original_images[page_idx], compressed_images[page_idx]
+                    )
+                    
+                    page_metrics = {'page': page_idx}
+                    
+                    ref_key = (page_idx, original_img.shape)
+                    if ref_key not in reference:
+                        reference[ref_key] = self._downscale(
+                            original_img, self.config.metric_max_edge
+                        )
+                    small_ref = reference[ref_key]
+                    small_cand = self._downscale(compressed_img, self.config.metric_max_edge)
+                    
+                    # PSNR (existing logic)
+                    if self.config.psnr_enabled:
+                        psnr = self._compute_psnr(small_ref, small_cand)
+                        if psnr is not None:
+                            page_metrics['psnr'] = psnr
+                    
+                    # SSIM
+                    if self.config.ssim_enabled:
+                        if ref_key not in reference_gray:
+                            reference_gray[ref_key] = self._to_gray(small_ref)
+                        ssim_val = self._compute_ssim(
+                            reference_gray[ref_key], self._to_gray(small_cand)
+                        )
+                        if ssim_val is not None:
+                            page_metrics['ssim'] = ssim_val
+                    
+                    if self.config.lpips_enabled:
+                        edge = self.config.lpips_max_edge
+                        pair = (
+                            self._downscale(original_img, edge),
+                            self._downscale(compressed_img, edge),
+                        )
+                        lpips_jobs.append((page_metrics, pair))
+                    
+                    metrics.page_metrics.append(page_metrics)
+            
+            # LPIPS: one batched forward pass over all candidates and pages
+            if lpips_jobs:
+                values = self._compute_lpips_batch([pair for _, pair in lpips_jobs])
+                for (page_metrics, _), lpips_val in zip(lpips_jobs, values):
                     if lpips_val is not None:
-                        lpips_values.append(lpips_val)
                         page_metrics['lpips'] = lpips_val
-                
-                metrics.page_metrics.append(page_metrics)
-            
-            # Calculate average metrics
-            if psnr_values:
-                metrics.psnr = sum(psnr_values) / len(psnr_values)
-                metrics.psnr_passed = metrics.psnr >= self.config.psnr_threshold
-                metrics.gates_evaluated.append('psnr')
-                if metrics.psnr_passed:
-                    metrics.gates_passed.append('psnr')
-                else:
-                    metrics.gates_failed.append('psnr')
-            
-            if ssim_values:
-                metrics.ssim = sum(ssim_values) / len(ssim_values)
-                metrics.ssim_passed = metrics.ssim >= self.config.ssim_threshold
-                metrics.gates_evaluated.append('ssim')
-                if metrics.ssim_passed:
-                    metrics.gates_passed.append('ssim')
-                else:
-                    metrics.gates_failed.append('ssim')
             
-            if lpips_values:
-                metrics.lpips = sum(lpips_values) / len(lpips_values)
-                metrics.lpips_passed = metrics.lpips <= self.config.lpips_threshold
-                metrics.gates_evaluated.append('lpips')
-                if metrics.lpips_passed:
-                    metrics.gates_passed.append('lpips')
-                else:
-                    metrics.gates_failed.append('lpips')
-            
-            # Determine overall pass/fail
-            metrics.overall_passed = self._evaluate_overall_result(metrics)
-            
-            return metrics.overall_passed, metrics
+            for i in evaluated:
+                metrics = results[i][1]
+                results[i] = (self._summarize(metrics), metrics)
+            return results
             
         except Exception as e:
             print(f"Error in quality evaluation: {e}")
             # Fail open on errors
-            metrics.overall_passed = True
-            return True, metrics
+            for _, metrics in results:
+                metrics.overall_passed = True
+            return [(True, metrics) for _, metrics in results]
+    
+    def _summarize(self, metrics: QualityMetrics) -> bool:
+        """Average the per-page metrics, apply thresholds and return the overall verdict."""
+        psnr_values = [p['psnr'] for p in metrics.page_metrics if 'psnr' in p]
+        ssim_values = [p['ssim'] for p in metrics.page_metrics if 'ssim' in p]
+        lpips_values = [p['lpips'] for p in metrics.page_metrics if 'lpips' in p]
+        
+        # Calculate average metrics
+        if psnr_values:
+            metrics.psnr = sum(psnr_values) / len(psnr_values)
+            metrics.psnr_passed = metrics.psnr >= self.config.psnr_threshold
+            metrics.gates_evaluated.append('psnr')
+            if metrics.psnr_passed:
+                metrics.gates_passed.append('psnr')
+            else:
+                metrics.gates_failed.append('psnr')
+        
+        if ssim_values:
+            metrics.ssim = sum(ssim_values) / len(ssim_values)
+            metrics.ssim_passed = metrics.ssim >= self.config.ssim_threshold
+            metrics.gates_evaluated.append('ssim')
+            if metrics.ssim_passed:
+                metrics.gates_passed.append('ssim')
+            else:
+                metrics.gates_failed.append('ssim')
+        
+        if lpips_values:
+            metrics.lpips = sum(lpips_values) / len(lpips_values)
+            metrics.lpips_passed = metrics.lpips <= self.config.lpips_threshold
+            metrics.gates_evaluated.append('lpips')
+            if metrics.lpips_passed:
+                metrics.gates_passed.append('lpips')
+            else:
+                metrics.gates_failed.append('lpips')
+        
+        # Determine overall pass/fail
+        metrics.overall_passed = self._evaluate_overall_result(metrics)
+        return metrics.overall_passed
     
     def _evaluate_overall_result(self, metrics: QualityMetrics) -> bool:
         """Determine if quality gates passed overall."""
@@ -294,8 +391,31 @@ class QualityGateChecker:
         else:
             return list(range(max_pages))
     
-    def _rasterize_pdf(self, pdf_path: Path) -> List[Any]:
+    def _rasterize_original(self, pdf_path: Path, renderer: Optional[Renderer] = None) -> List[Any]:
+        """Rasterize the original once per file, reusing it for each candidate it is
+        checked against."""
+        st = pdf_path.stat()
+        key = (str(pdf_path), st.st_mtime_ns, st.st_size, self.config.raster_dpi)
+        cached = getattr(self._original_cache, "entry", None)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        images = self._rasterize_pdf(pdf_path, renderer)
+        # Shared by reference with every candidate comparison (and pool thread): make it read-only
+        for img in images:
+            img.setflags(write=False)
+        self._original_cache.entry = (key, images) if images else None
+        return images
+
+    def _rasterize_pdf(self, pdf_path: Path, renderer: Optional[Renderer] = None) -> List[Any]:
         """Rasterize PDF pages to numpy arrays for comparison."""
+        renderer = renderer or self.renderer
+        if renderer is not None:
+            try:
+                images = renderer(pdf_path, self.config.raster_dpi)
+                if images:
+                    return images
+            except Exception as e:
+                print(f"In-process rendering failed for {pdf_path}, using Ghostscript: {e}")
         try:
             with tempfile.TemporaryDirectory() as temp_dir:
                 temp_path = Path(temp_dir)
@@ -307,13 +427,15 @@ class QualityGateChecker:
                     "gs", "-dNOPAUSE", "-dBATCH", "-dSAFER",
                     "-sDEVICE=png16m",
                     f"-r{self.config.raster_dpi}",
+                    "-dNumRenderingThreads=4",
+                    "-dBufferSpace=200000000",
                     f"-sOutputFile={output_pattern}",
                     str(pdf_path)
                 ]
                 
-                result = subprocess.run(cmd, capture_output=True, text=True)
+                result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
                 if result.returncode != 0:
-                    print(f"Ghostscript error: {result.stderr}")
+                    print(f"Ghostscript error: {result.stderr.decode(errors='replace')}")
                     return []
                 
                 # Load generated images
@@ -333,22 +455,27 @@ class QualityGateChecker:
             print(f"Error rasterizing {pdf_path}: {e}")
             return []
     
+    @staticmethod
+    def _common_crop(img1: Any, img2: Any) -> Tuple[Any, Any]:
+        """Crop two page rasters to their overlapping size."""
+        if img1.shape == img2.shape:
+            return img1, img2
+        min_h = min(img1.shape[0], img2.shape[0])
+        min_w = min(img1.shape[1], img2.shape[1])
+        return img1[:min_h, :min_w], img2[:min_h, :min_w]
+
     def _compute_psnr(self, img1: Any, img2: Any) -> Optional[float]:
         """Compute PSNR between two images."""
         try:
-            # Ensure same dimensions
-            if img1.shape != img2.shape:
-                # Resize to smaller dimensions
-                min_h = min(img1.shape[0], img2.shape[0])
-                min_w = min(img1.shape[1], img2.shape[1])
-                img1 = img1[:min_h, :min_w]
-                img2 = img2[:min_h, :min_w]
-            
-            # Convert to float and compute MSE
-            img1_f = img1.astype(np.float64)
-            img2_f = img2.astype(np.float64)
-            
-            mse = np.mean((img1_f - img2_f) ** 2)
+            img1, img2 = self._common_crop(img1, img2)
+            if HAS_CV2:
+                # Sum of squared differences in one SIMD pass, without a difference buffer
+                mse = cv2.norm(img1, img2, cv2.NORM_L2SQR) / img1.size
+            else:
+                # Exact MSE without float64 copies: int16 difference, squares summed in int64
+                diff = np.subtract(img1, img2, dtype=np.int16)
+                flat = diff.ravel()
+                mse = float(np.einsum('i,i->', flat, flat, dtype=np.int64)) / flat.size
             if mse == 0:
                 return 100.0  # Perfect match
             
@@ -360,29 +487,37 @@ class QualityGateChecker:
             print(f"Error computing PSNR: {e}")
             return None
     
+    @staticmethod
+    def _downscale(img: Any, max_edge: int) -> Any:
+        """Area-average a page down so its long edge is at most max_edge px (never upscales)."""
+        h, w = img.shape[:2]
+        if not max_edge or max(h, w) <= max_edge:
+            return img
+        scale = max_edge / max(h, w)
+        size = (max(1, round(w * scale)), max(1, round(h * scale)))
+        if HAS_CV2:
+            return cv2.resize(img, size, interpolation=cv2.INTER_AREA)
+        return np.asarray(Image.fromarray(img).resize(size, Image.BOX))
+
+    @staticmethod
+    def _to_gray(img: Any) -> Any:
+        """Luminance in [0, 1] as float32 (rgb2gray weights); 2-D input is passed through."""
+        if img.ndim != 3:
+            return img
+        weights = np.array([0.2125, 0.7154, 0.0721], dtype=np.float32) / 255.0
+        return img[..., :3] @ weights
+
     def _compute_ssim(self, img1: Any, img2: Any) -> Optional[float]:
-        """Compute SSIM between two images."""
+        """Compute SSIM between two images (RGB pages or _to_gray output)."""
         if not HAS_SKIMAGE:
             return None
             
         try:
-            # Ensure same dimensions
-            if img1.shape != img2.shape:
-                min_h = min(img1.shape[0], img2.shape[0])
-                min_w = min(img1.shape[1], img2.shape[1])
-                img1 = img1[:min_h, :min_w]
-                img2 = img2[:min_h, :min_w]
-            
-            # Convert to grayscale for SSIM
-            if len(img1.shape) == 3:
-                img1_gray = rgb2gray(img1)
-                img2_gray = rgb2gray(img2)
-            else:
-                img1_gray = img1
-                img2_gray = img2
+            # float32 luminance: skimage keeps float32 through its filters (rgb2gray gave float64)
+            img1_gray, img2_gray = self._common_crop(self._to_gray(img1), self._to_gray(img2))
+            data_range = 255.0 if img1_gray.dtype == np.uint8 else 1.0
             
-            # Compute SSIM
-            ssim_val = ssim(img1_gray, img2_gray, data_range=1.0)
+            ssim_val = ssim(img1_gray, img2_gray, data_range=data_range)
             return float(ssim_val)
             
         except Exception as e:
@@ -391,7 +526,7 @@ class QualityGateChecker:
     
     def _compute_lpips(self, img1: Any, img2: Any) -> Optional[float]:
         """Compute LPIPS between two images."""
-        if not HAS_LPIPS or lpips_model is None:
+        if not _load_lpips():
             return None
             
         try:
@@ -403,14 +538,18 @@ class QualityGateChecker:
                 img2 = img2[:min_h, :min_w]
             
             # Convert to torch tensors and normalize to [-1, 1]
-            img1_tensor = torch.from_numpy(img1).float().permute(2, 0, 1).unsqueeze(0)
-            img2_tensor = torch.from_numpy(img2).float().permute(2, 0, 1).unsqueeze(0)
+            img1_tensor = (
+                torch.from_numpy(img1).to(lpips_device).float().permute(2, 0, 1).unsqueeze(0)
+            )
+            img2_tensor = (
+                torch.from_numpy(img2).to(lpips_device).float().permute(2, 0, 1).unsqueeze(0)
+            )
             
             img1_tensor = (img1_tensor / 255.0) * 2.0 - 1.0
             img2_tensor = (img2_tensor / 255.0) * 2.0 - 1.0
             
             # Compute LPIPS distance
-            with torch.no_grad():
+            with torch.inference_mode():
                 lpips_dist = lpips_model(img1_tensor, img2_tensor)
                 return float(lpips_dist.item())
             
@@ -418,6 +557,38 @@ class QualityGateChecker:
             print(f"Error computing LPIPS: {e}")
             return None
     
+    def _compute_lpips_batch(self, pairs: List[Tuple[Any, Any]]) -> List[Optional[float]]:
+        """Compute LPIPS for many page pairs: one network call per distinct page size."""
+        if not _load_lpips():
+            return [None] * len(pairs)
+            
+        # (N, H, W, 3) uint8 -> (N, 3, H, W) in [-1, 1], converted on the device
+        def to_tensor(images: List[Any]) -> Any:
+            batch = torch.from_numpy(np.stack(images))
+            if lpips_device.type == "cuda":
+                # Page-locked staging buffer: the host-to-device copy runs as async DMA
+                batch = batch.pin_memory().to(lpips_device, non_blocking=True)
+            return batch.permute(0, 3, 1, 2).float() / 127.5 - 1.0
+        
+        by_shape: Dict[Tuple[int, ...], List[int]] = {}
+        for i, (img1, _) in enumerate(pairs):
+            by_shape.setdefault(img1.shape, []).append(i)
+        
+        values: List[Optional[float]] = [None] * len(pairs)
+        for indices in by_shape.values():
+            try:
+                # inference_mode: no autograd bookkeeping at all (cheaper than no_grad)
+                with torch.inference_mode():
+                    dists = lpips_model(
+                        to_tensor([pairs[i][0] for i in indices]),
+                        to_tensor([pairs[i][1] for i in indices]),
+                    )
+                for i, d in zip(indices, dists.flatten().tolist()):
+                    values[i] = float(d)
+            except Exception as e:
+                print(f"Error computing LPIPS: {e}")
+        return values
+    
     def create_quality_report(self, metrics: QualityMetrics, output_file: Optional[Path] = None) -> str:
         """Create a detailed quality assessment report."""
         report_lines = [